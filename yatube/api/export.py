@@ -0,0 +1,147 @@
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+
+from .serializers import (
+    CommentSerializer,
+    FollowSerializer,
+    GroupSerializer,
+    PostSerializer,
+)
+
+
+# Сколько строк драйвер базы отдаёт за один fetchmany.
+EXPORT_CHUNK_SIZE = 2000
+# Строки склеиваются в блоки такого размера перед отправкой.
+EXPORT_BUFFER_SIZE = 64 * 1024
+# Для каждой выгрузки: сериализатор, модель и поиск для фильтров.
+EXPORTS = {
+    "posts": (
+        PostSerializer,
+        Post,
+        {
+            "since": "pub_date__gte",
+            "until": "pub_date__lt",
+            "author": "author",
+            "group": "group",
+        },
+    ),
+    "comments": (
+        CommentSerializer,
+        Comment,
+        {
+            "since": "pub_date__gte",
+            "until": "pub_date__lt",
+            "author": "author",
+            "group": "post__group",
+        },
+    ),
+    "follows": (FollowSerializer, Follow, {"author": "author"}),
+    "groups": (GroupSerializer, Group, {"group": "pk"}),
+}
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(kind, serializer, since=None, until=None, **filters):
+    """
+    Строки выгрузки kind в порядке первичного ключа или даты,
+    чтобы база шла по индексу без сортировки всей таблицы.
+    """
+    _, model, lookups = EXPORTS[kind]
+    if since:
+        filters["since"] = start_of_day(since)
+    if until:
+        # until включительно: до начала следующего дня.
+        filters["until"] = start_of_day(until + timedelta(days=1))
+    queryset = model.objects.filter(
+        **{
+            lookups[name]: value
+            for name, value in filters.items()
+            if value is not None
+        }
+    )
+    if "since" in lookups:
+        queryset = queryset.order_by("pub_date", "pk")
+    else:
+        queryset = queryset.order_by("pk")
+    # База выбирается сейчас: строки читаются уже после того,
+    # как middleware сбросит выбор реплики для запроса.
+    queryset = queryset.using(queryset.db)
+    return serializer.values(queryset).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(serializer, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(serializer.names)
+    for row in rows:
+        data = serializer.to_representation(row)
+        yield writer.writerow([plain(value) for value in data.values()])
+
+
+def jsonl_lines(serializer, rows):
+    for row in rows:
+        data = serializer.to_representation(row)
+        yield json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield "\n"
+
+
+def encode(lines, size=EXPORT_BUFFER_SIZE):
+    """Склеивает строки в блоки байтов не меньше size."""
+    buffer = []
+    buffered = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b"".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def gzip_chunks(chunks):
+    """Сжимает поток блоков в формат gzip по мере чтения."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(kind, serializer, format="csv", gzip=False, **filters):
+    """Байты выгрузки: CSV с заголовком или JSON по строке на запись."""
+    rows = export_rows(kind, serializer, **filters)
+    lines = csv_lines if format == "csv" else jsonl_lines
+    chunks = encode(lines(serializer, rows))
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def export_filename(kind, format="csv", gzip=False):
+    return f"{kind}.{format}.gz" if gzip else f"{kind}.{format}"
@@ -0,0 +1,57 @@
+from django import forms
+from django.contrib.auth import get_user_model
+
+from posts.forms import PostForm
+from posts.models import Group
+
+from .export import EXPORTS, FORMATS
+
+
+User = get_user_model()
+
+
+class ApiPostForm(PostForm):
+    """Форма поста, в которой группа задаётся slug, как в ответах API."""
+
+    group = forms.ModelChoiceField(
+        Group.objects.all(), to_field_name="slug", required=False
+    )
+
+
+class ExportForm(forms.Form):
+    """Параметры выгрузки, общие для view и команды export_data."""
+
+    kind = forms.ChoiceField(choices=[(kind, kind) for kind in EXPORTS])
+    format = forms.ChoiceField(
+        choices=[(name, name) for name in FORMATS], required=False
+    )
+    since = forms.DateField(required=False)
+    until = forms.DateField(required=False)
+    author = forms.ModelChoiceField(
+        User.objects.all(), to_field_name="username", required=False
+    )
+    group = forms.ModelChoiceField(
+        Group.objects.all(), to_field_name="slug", required=False
+    )
+    gzip = forms.BooleanField(required=False)
+
+    def clean_format(self):
+        return self.cleaned_data["format"] or "csv"
+
+    def clean(self):
+        data = super().clean()
+        since, until = data.get("since"), data.get("until")
+        if since and until and since > until:
+            self.add_error("until", "Конец периода раньше начала")
+        if data.get("kind") in EXPORTS:
+            _, _, lookups = EXPORTS[data["kind"]]
+            for name in ("since", "until", "author", "group"):
+                if data.get(name) and name not in lookups:
+                    self.add_error(name, "Не поддерживается этой выгрузкой")
+        return data
+
+    def filters(self):
+        return {
+            name: self.cleaned_data[name]
+            for name in ("since", "until", "author", "group")
+        }
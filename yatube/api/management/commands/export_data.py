@@ -0,0 +1,76 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import EXPORTS, FORMATS, export_stream
+from api.forms import ExportForm
+from api.serializers import InvalidFields
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоково выгружает посты, комментарии, подписки или группы "
+        "в CSV или JSON Lines"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(EXPORTS))
+        parser.add_argument("--format", choices=list(FORMATS), default="csv")
+        parser.add_argument("--since", help="Начало периода, ГГГГ-ММ-ДД")
+        parser.add_argument("--until", help="Конец периода включительно")
+        parser.add_argument("--author", help="username автора")
+        parser.add_argument("--group", help="slug группы")
+        parser.add_argument("--fields", help="Поля через запятую")
+        parser.add_argument("--gzip", action="store_true", help="Сжимать gzip")
+        parser.add_argument(
+            "--output", default="-", help="Файл выгрузки, по умолчанию stdout"
+        )
+
+    def handle(self, *args, **options):
+        form = ExportForm(
+            {
+                name: options[name]
+                for name in (
+                    "kind",
+                    "format",
+                    "since",
+                    "until",
+                    "author",
+                    "group",
+                    "gzip",
+                )
+                if options[name]
+            }
+        )
+        if not form.is_valid():
+            raise CommandError(
+                "; ".join(
+                    f"{name}: {' '.join(errors)}"
+                    for name, errors in form.errors.items()
+                )
+            )
+        data = form.cleaned_data
+        serializer_class = EXPORTS[data["kind"]][0]
+        try:
+            serializer = serializer_class(options["fields"])
+        except InvalidFields as exc:
+            raise CommandError(f"Неизвестные поля: {exc}")
+        chunks = export_stream(
+            data["kind"],
+            serializer,
+            data["format"],
+            data["gzip"],
+            **form.filters(),
+        )
+        if options["output"] == "-":
+            self.write(sys.stdout.buffer, chunks)
+            return
+        with open(options["output"], "wb") as output:
+            self.write(output, chunks)
+        self.stderr.write(
+            self.style.SUCCESS(f"Выгрузка записана в {options['output']}")
+        )
+
+    def write(self, output, chunks):
+        for chunk in chunks:
+            output.write(chunk)
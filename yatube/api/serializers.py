@@ -0,0 +1,94 @@
+from django.core.files.storage import default_storage
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def media_url(name):
+    return default_storage.url(name) if name else None
+
+
+class ValuesSerializer:
+    """
+    Сериализует строки queryset.values() без создания моделей.
+
+    fields сопоставляет имя поля в ответе с путём для .values():
+    связанные таблицы подтягиваются тем же JOIN, что и в
+    select_related. Через ?fields= клиент выбирает подмножество
+    полей, и в SELECT попадают только нужные столбцы.
+    """
+
+    fields = {}
+    # Поля, без которых не построить курсор следующей страницы.
+    required = ()
+    converters = {}
+
+    def __init__(self, requested=None):
+        if not requested:
+            self.names = list(self.fields)
+            return
+        self.names = [name for name in requested.split(",") if name]
+        unknown = set(self.names) - set(self.fields)
+        if unknown:
+            raise InvalidFields(", ".join(sorted(unknown)))
+
+    def values(self, queryset):
+        paths = {self.fields[name] for name in self.names}
+        return queryset.values(*paths.union(self.required))
+
+    def to_representation(self, row):
+        data = {}
+        for name in self.names:
+            value = row[self.fields[name]]
+            converter = self.converters.get(name)
+            data[name] = converter(value) if converter else value
+        return data
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class PostSerializer(ValuesSerializer):
+    fields = {
+        "id": "pk",
+        "text": "text",
+        "pub_date": "pub_date",
+        "author": "author__username",
+        "group": "group__slug",
+        "image": "image",
+        "comments_count": "comments_count",
+    }
+    required = ("pk", "pub_date")
+    converters = {"image": media_url}
+
+
+class GroupSerializer(ValuesSerializer):
+    fields = {
+        "id": "pk",
+        "slug": "slug",
+        "title": "title",
+        "description": "description",
+        "posts_count": "posts_count",
+    }
+    required = ("pk",)
+
+
+class CommentSerializer(ValuesSerializer):
+    fields = {
+        "id": "pk",
+        "post": "post_id",
+        "text": "text",
+        "pub_date": "pub_date",
+        "author": "author__username",
+    }
+    required = ("pk", "pub_date")
+
+
+class FollowSerializer(ValuesSerializer):
+    fields = {
+        "id": "pk",
+        "user": "user__username",
+        "author": "author__username",
+    }
+    required = ("pk",)
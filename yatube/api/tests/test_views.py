@@ -0,0 +1,356 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from api import urls as api_urls
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class TestApiViews(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="ApiUser")
+        cls.author = User.objects.create_user(username="ApiAuthor")
+        cls.group = Group.objects.create(
+            title="Группа API", slug="api-group", description="Описание"
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for number in range(25):
+            post = Post.objects.create(
+                text=f"Пост API {number}",
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+            )
+        cls.post = post
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f"Комментарий {number}"
+            )
+        cls.urls = {
+            "api:posts": reverse("api:posts"),
+            "api:post_detail": reverse("api:post_detail", args=[cls.post.pk]),
+            "api:comments": reverse("api:comments", args=[cls.post.pk]),
+            "api:groups": reverse("api:groups"),
+            "api:group_detail": reverse(
+                "api:group_detail", args=[cls.group.slug]
+            ),
+            "api:follow": reverse("api:follow"),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.auth_client = Client()
+        self.auth_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def post_json(self, client, url, data, method="post"):
+        return getattr(client, method)(
+            url, json.dumps(data), content_type="application/json"
+        )
+
+    def test_api_posts_cursor_pagination(self):
+        """Проверяем, что лента API листается курсором без пропусков."""
+        url = reverse("api:posts") + "?limit=10"
+        seen = []
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data["results"]), 10)
+            seen.extend(post["id"] for post in data["results"])
+            url = data["next"]
+        expected = list(
+            Post.objects.order_by("-pub_date", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+        self.assertEqual(seen, expected)
+
+    def test_api_posts_filters(self):
+        """Проверяем фильтры ленты по группе и автору."""
+        response = self.client.get(
+            reverse("api:posts"), {"group": self.group.slug, "limit": 100}
+        )
+        results = response.json()["results"]
+        self.assertEqual(len(results), self.group.posts.count())
+        self.assertTrue(
+            all(post["group"] == self.group.slug for post in results)
+        )
+        response = self.client.get(
+            reverse("api:posts"), {"author": self.user.username}
+        )
+        self.assertEqual(response.json()["results"], [])
+
+    def test_api_sparse_fields(self):
+        """Проверяем, что ?fields= сужает ответ и SELECT."""
+        response = self.client.get(reverse("api:posts"), {"fields": "id,text"})
+        self.assertEqual(set(response.json()["results"][0]), {"id", "text"})
+        sql = response.query_stats.queries[0][0]
+        self.assertNotIn("auth_user", sql)
+        response = self.client.get(
+            reverse("api:posts"), {"fields": "id,password"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_invalid_cursor(self):
+        response = self.client.get(reverse("api:posts"), {"cursor": "xx"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_etag_not_modified(self):
+        """Проверяем ответ 304 на If-None-Match с прежним ETag."""
+        url = reverse("api:post_detail", args=[self.post.pk])
+        response = self.client.get(url)
+        self.assertIn("ETag", response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_api_post_create_and_edit(self):
+        """Проверяем создание, правку и удаление поста автором."""
+        url = reverse("api:posts")
+        response = self.post_json(self.client, url, {"text": "Аноним"})
+        self.assertEqual(response.status_code, 401)
+        response = self.post_json(
+            self.author_client,
+            url,
+            {"text": "Новый пост API", "group": self.group.slug},
+        )
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data["author"], self.author.username)
+        self.assertEqual(data["group"], self.group.slug)
+        detail_url = reverse("api:post_detail", args=[data["id"]])
+        response = self.post_json(
+            self.auth_client, detail_url, {"text": "Чужой"}, "patch"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.post_json(
+            self.author_client, detail_url, {"text": "Исправлено"}, "patch"
+        )
+        self.assertEqual(response.json()["text"], "Исправлено")
+        self.assertEqual(response.json()["group"], self.group.slug)
+        response = self.author_client.delete(detail_url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=data["id"]).exists())
+
+    def test_api_post_create_validation(self):
+        response = self.post_json(
+            self.author_client, reverse("api:posts"), {"group": "nope"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()["errors"]), {"text", "group"})
+
+    def test_api_comments(self):
+        """Проверяем список комментариев и добавление нового."""
+        url = reverse("api:comments", args=[self.post.pk])
+        response = self.client.get(url, {"order": "oldest"})
+        texts = [comment["text"] for comment in response.json()["results"]]
+        self.assertEqual(texts[0], "Комментарий 0")
+        response = self.post_json(
+            self.auth_client, url, {"text": "Комментарий API"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["post"], self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 4)
+        response = self.client.get(reverse("api:comments", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_groups(self):
+        response = self.client.get(reverse("api:groups"))
+        self.assertEqual(response.json()["results"][0]["slug"], "api-group")
+        response = self.client.get(
+            reverse("api:group_detail", args=[self.group.slug])
+        )
+        self.assertEqual(response.json()["title"], self.group.title)
+
+    def test_api_follow(self):
+        """Проверяем список подписок, подписку и отписку."""
+        url = reverse("api:follow")
+        self.assertEqual(self.client.get(url).status_code, 401)
+        response = self.auth_client.get(url)
+        self.assertEqual(
+            response.json()["results"][0]["author"], self.author.username
+        )
+        response = self.post_json(
+            self.author_client, url, {"author": self.user.username}
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.post_json(
+            self.author_client, url, {"author": self.author.username}
+        )
+        self.assertEqual(response.status_code, 400)
+        unfollow_url = reverse("api:unfollow", args=[self.user.username])
+        self.assertEqual(
+            self.author_client.delete(unfollow_url).status_code, 204
+        )
+        self.assertEqual(
+            self.author_client.delete(unfollow_url).status_code, 404
+        )
+
+    def test_api_method_not_allowed(self):
+        response = self.auth_client.delete(reverse("api:groups"))
+        self.assertEqual(response.status_code, 405)
+
+    def test_api_urls_have_query_budgets(self):
+        """Проверяем, что бюджет задан для каждого адреса api.urls."""
+        names = {f"api:{pattern.name}" for pattern in api_urls.urlpatterns}
+        self.assertEqual(
+            names - {"api:unfollow", "api:export"}, set(self.urls)
+        )
+
+    def test_api_views_within_query_budget(self):
+        """
+        Проверяем, что чтения и записи API укладываются
+        в бюджеты своих методов.
+        """
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.auth_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinQueryBudget(response)
+        post_url = self.urls["api:post_detail"]
+        writes = (
+            ("post", self.urls["api:posts"], {"text": "Бюджет"}),
+            ("post", self.urls["api:comments"], {"text": "Бюджет"}),
+            ("post", self.urls["api:follow"], {"author": "ApiUser"}),
+            ("patch", post_url, {"text": "Бюджет"}),
+        )
+        for method, url, data in writes:
+            with self.subTest(method=method, url=url):
+                response = self.post_json(
+                    self.author_client, url, data, method
+                )
+                self.assertLess(response.status_code, 300)
+                self.assertWithinQueryBudget(response)
+        response = self.auth_client.delete(
+            reverse("api:unfollow", args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertWithinQueryBudget(response)
+
+
+class TestApiExport(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(
+            username="Exporter", is_staff=True
+        )
+        cls.author = User.objects.create_user(username="ExportAuthor")
+        cls.group = Group.objects.create(
+            title="Группа выгрузки", slug="export-group", description="Текст"
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост, с запятой и "кавычками" {number}',
+                author=cls.author if number % 2 else cls.staff,
+                group=cls.group if number < 3 else None,
+            )
+            for number in range(6)
+        ]
+        old = timezone.now() - timedelta(days=10)
+        Post.objects.filter(pk=cls.posts[0].pk).update(pub_date=old)
+        Comment.objects.create(post=cls.posts[0], author=cls.author, text="К")
+        Follow.objects.create(user=cls.staff, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def export(self, kind, **params):
+        return self.client.get(reverse("api:export", args=[kind]), params)
+
+    def test_api_export_csv(self):
+        """Проверяем потоковую выгрузку постов в CSV с фильтрами."""
+        response = self.export("posts", author=self.author.username)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="posts.csv"', response["Content-Disposition"])
+        self.assertWithinQueryBudget(response)
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(
+            [int(row["id"]) for row in rows],
+            [post.pk for post in self.posts[1::2]],
+        )
+        self.assertEqual(rows[0]["text"], self.posts[1].text)
+        self.assertEqual(rows[0]["author"], self.author.username)
+
+    def test_api_export_date_range(self):
+        today = timezone.now().date()
+        response = self.export(
+            "posts", since=str(today - timedelta(days=1)), fields="id"
+        )
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(
+            content.split(), ["id"] + [str(post.pk) for post in self.posts[1:]]
+        )
+        response = self.export("posts", since=str(today), until="2000-01-01")
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_export_jsonl_gzip(self):
+        """Проверяем JSON Lines со сжатием gzip на лету."""
+        response = self.export(
+            "comments", format="jsonl", gzip="1", group=self.group.slug
+        )
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn("comments.jsonl.gz", response["Content-Disposition"])
+        content = gzip.decompress(b"".join(response.streaming_content))
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["post"], self.posts[0].pk)
+
+    def test_api_export_unsupported_filter(self):
+        response = self.export("follows", group=self.group.slug)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("group", response.json()["errors"])
+        self.assertEqual(self.export("users").status_code, 404)
+
+    def test_api_export_staff_only(self):
+        self.client.force_login(self.author)
+        self.assertEqual(self.export("posts").status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.export("posts").status_code, 401)
+
+    def test_api_export_command(self):
+        """Проверяем команду export_data с выводом в файл."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "follows.jsonl.gz")
+            call_command(
+                "export_data",
+                "follows",
+                format="jsonl",
+                gzip=True,
+                author=self.author.username,
+                output=path,
+                stderr=StringIO(),
+            )
+            with gzip.open(path, "rt") as output:
+                rows = [json.loads(line) for line in output]
+        self.assertEqual(
+            rows,
+            [
+                {
+                    "id": Follow.objects.get().pk,
+                    "user": self.staff.username,
+                    "author": self.author.username,
+                }
+            ],
+        )
+        with self.assertRaises(CommandError):
+            call_command("export_data", "groups", since="2020-01-01")
@@ -0,0 +1,322 @@
+import json
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import (
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, set_response_etag
+
+from posts.forms import CommentForm
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import (
+    CursorPaginator,
+    InvalidCursor,
+    decode_cursor,
+    get_id_page,
+)
+from posts.templatetags.paginator_tags import next_cursor
+from posts.views import COMMENTS_ORDERINGS
+
+from .export import EXPORTS, FORMATS, export_filename, export_stream
+from .forms import ApiPostForm, ExportForm
+from .serializers import (
+    CommentSerializer,
+    FollowSerializer,
+    GroupSerializer,
+    InvalidFields,
+    PostSerializer,
+)
+
+
+User = get_user_model()
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def error(detail, status):
+    return JsonResponse({"detail": detail}, status=status)
+
+
+def api_view(*methods, login_required=False):
+    """
+    Общая обвязка view API: допустимые методы, авторизация для
+    записи, ошибки в JSON и ETag с ответом 304 на If-None-Match
+    (кроме потоковых ответов).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return error(f"Метод {request.method} не разрешён", 405)
+            if (
+                login_required or request.method != "GET"
+            ) and not request.user.is_authenticated:
+                return error("Нужна авторизация", 401)
+            try:
+                response = view(request, *args, **kwargs)
+            except Http404:
+                return error("Не найдено", 404)
+            except ApiError as exc:
+                return error(exc.detail, exc.status)
+            if (
+                request.method != "GET"
+                or response.status_code != 200
+                or response.streaming
+            ):
+                return response
+            set_response_etag(response)
+            return get_conditional_response(
+                request, etag=response["ETag"], response=response
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def read_json(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ApiError("Тело запроса не является JSON")
+    if not isinstance(data, dict):
+        raise ApiError("Ожидается JSON-объект")
+    return data
+
+
+def get_serializer(serializer_class, request):
+    try:
+        return serializer_class(request.GET.get("fields"))
+    except InvalidFields as exc:
+        raise ApiError(f"Неизвестные поля: {exc}")
+
+
+def page_size(request):
+    try:
+        return max(1, min(int(request.GET["limit"]), MAX_PAGE_SIZE))
+    except (KeyError, ValueError):
+        return PAGE_SIZE
+
+
+def next_url(request, name, value):
+    if not value:
+        return None
+    query = request.GET.copy()
+    query[name] = value
+    return f"{request.path}?{query.urlencode()}"
+
+
+def cursor_response(request, queryset, serializer, ordering=None):
+    """Страница по курсору (pub_date, id) без COUNT(*) и OFFSET."""
+    paginator = CursorPaginator(
+        serializer.values(queryset), page_size(request), ordering=ordering
+    )
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            raise ApiError("Неверный курсор")
+        page = paginator.get_cursor_page(cursor)
+    else:
+        page = paginator.get_first_page()
+    return JsonResponse(
+        {
+            "results": serializer.serialize(page),
+            "next": next_url(request, "cursor", next_cursor(page)),
+        }
+    )
+
+
+def id_response(request, queryset, serializer):
+    """Страница по убыванию id для коротких списков без даты."""
+    rows, next_after = get_id_page(
+        serializer.values(queryset),
+        request.GET.get("after"),
+        page_size(request),
+    )
+    return JsonResponse(
+        {
+            "results": serializer.serialize(rows),
+            "next": next_url(request, "after", next_after),
+        }
+    )
+
+
+def detail_response(request, serializer_class, queryset, status=200):
+    serializer = get_serializer(serializer_class, request)
+    rows = list(serializer.values(queryset)[:1])
+    if not rows:
+        raise Http404
+    return JsonResponse(serializer.to_representation(rows[0]), status=status)
+
+
+def form_errors(form):
+    return JsonResponse({"errors": form.errors}, status=400)
+
+
+@api_view("GET", "POST")
+def posts(request):
+    if request.method == "POST":
+        form = ApiPostForm(read_json(request))
+        if not form.is_valid():
+            return form_errors(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        return detail_response(
+            request, PostSerializer, Post.objects.filter(pk=post.pk), 201
+        )
+    queryset = Post.objects.all()
+    if request.GET.get("group"):
+        queryset = queryset.filter(group__slug=request.GET["group"])
+    if request.GET.get("author"):
+        queryset = queryset.filter(author__username=request.GET["author"])
+    return cursor_response(
+        request, queryset, get_serializer(PostSerializer, request)
+    )
+
+
+@api_view("GET", "PATCH", "DELETE")
+def post_detail(request, post_id):
+    if request.method == "GET":
+        return detail_response(
+            request, PostSerializer, Post.objects.filter(pk=post_id)
+        )
+    post = get_object_or_404(
+        Post.objects.select_related("author", "group"), pk=post_id
+    )
+    if post.author_id != request.user.id:
+        raise ApiError("Изменять пост может только автор", 403)
+    if request.method == "DELETE":
+        post.delete()
+        return HttpResponse(status=204)
+    data = {"text": post.text, "group": post.group and post.group.slug}
+    form = ApiPostForm({**data, **read_json(request)}, instance=post)
+    if not form.is_valid():
+        return form_errors(form)
+    form.save()
+    return detail_response(
+        request, PostSerializer, Post.objects.filter(pk=post.pk)
+    )
+
+
+@api_view("GET")
+def groups(request):
+    return id_response(
+        request, Group.objects.all(), get_serializer(GroupSerializer, request)
+    )
+
+
+@api_view("GET")
+def group_detail(request, slug):
+    return detail_response(
+        request, GroupSerializer, Group.objects.filter(slug=slug)
+    )
+
+
+@api_view("GET", "POST")
+def comments(request, post_id):
+    if request.method == "POST":
+        post = get_object_or_404(
+            Post.objects.select_related("author"), pk=post_id
+        )
+        form = CommentForm(read_json(request))
+        if not form.is_valid():
+            return form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
+        return detail_response(
+            request,
+            CommentSerializer,
+            Comment.objects.filter(pk=comment.pk),
+            201,
+        )
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    order = request.GET.get("order")
+    if order not in COMMENTS_ORDERINGS:
+        order = "newest"
+    return cursor_response(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        get_serializer(CommentSerializer, request),
+        ordering=COMMENTS_ORDERINGS[order],
+    )
+
+
+@api_view("GET", "POST", login_required=True)
+def follow(request):
+    if request.method == "POST":
+        author = get_object_or_404(
+            User, username=read_json(request).get("author")
+        )
+        if author == request.user:
+            raise ApiError("Нельзя подписаться на себя")
+        relation, created = Follow.objects.get_or_create(
+            author=author, user=request.user
+        )
+        return detail_response(
+            request,
+            FollowSerializer,
+            Follow.objects.filter(pk=relation.pk),
+            201 if created else 200,
+        )
+    return id_response(
+        request,
+        Follow.objects.filter(user=request.user),
+        get_serializer(FollowSerializer, request),
+    )
+
+
+@api_view("DELETE")
+def unfollow(request, username):
+    deleted, _ = Follow.objects.filter(
+        author__username=username, user=request.user
+    ).delete()
+    if not deleted:
+        raise Http404
+    return HttpResponse(status=204)
+
+
+@api_view("GET", login_required=True)
+def export(request, kind):
+    """
+    Потоковая выгрузка всех строк kind в CSV или JSON Lines,
+    по желанию сжатая gzip на лету.
+    """
+    if not request.user.is_staff:
+        raise ApiError("Выгрузка доступна только сотрудникам", 403)
+    if kind not in EXPORTS:
+        raise Http404
+    serializer = get_serializer(EXPORTS[kind][0], request)
+    form = ExportForm({**request.GET.dict(), "kind": kind})
+    if not form.is_valid():
+        return form_errors(form)
+    data = form.cleaned_data
+    response = StreamingHttpResponse(
+        export_stream(
+            kind, serializer, data["format"], data["gzip"], **form.filters()
+        ),
+        content_type=(
+            "application/gzip" if data["gzip"] else FORMATS[data["format"]]
+        ),
+    )
+    filename = export_filename(kind, data["format"], data["gzip"])
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
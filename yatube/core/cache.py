@@ -0,0 +1,544 @@
+import atexit
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.signals import request_finished
+
+
+# Страницы лент занимают десятки килобайт и хорошо сжимаются,
+# мелкие значения вроде версий сжимать невыгодно.
+COMPRESS_MIN_LENGTH = 1024
+COMPRESS_LEVEL = 6
+STATS_FLUSH_INTERVAL = 5
+STATS_KEY_SEPARATOR = ":"
+CULL_EVERY = 100
+
+
+# Django создаёт свой экземпляр кеша в каждом потоке, и у каждого
+# свои несброшенные счётчики.
+_stats_caches = weakref.WeakSet()
+
+
+def stats_due(cache):
+    return time.monotonic() - cache._stats_flushed >= STATS_FLUSH_INTERVAL
+
+
+def flush_all_stats(due_only=False):
+    """
+    Сбрасывает счётчики всех кешей процесса: в конце запроса те,
+    что копятся дольше STATS_FLUSH_INTERVAL, при выходе — все.
+    """
+    for cache in list(_stats_caches):
+        if not due_only or stats_due(cache):
+            cache.flush_stats()
+
+
+def _flush_due_stats(**kwargs):
+    flush_all_stats(due_only=True)
+
+
+# Без этого счётчики короткой команды или простаивающего воркера
+# так и не попали бы в общее хранилище.
+atexit.register(flush_all_stats)
+request_finished.connect(_flush_due_stats)
+
+
+def key_prefix(key):
+    """Префикс ключа для статистики: всё до первого двоеточия."""
+    return str(key).split(STATS_KEY_SEPARATOR, 1)[0]
+
+
+def dumps(value):
+    """Возвращает (данные, сжаты ли они)."""
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) < COMPRESS_MIN_LENGTH:
+        return data, False
+    return zlib.compress(data, COMPRESS_LEVEL), True
+
+
+def loads(data, compressed):
+    if compressed:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+class StatsMixin:
+    """
+    Считает попадания и промахи кеша по префиксам ключей.
+
+    Счётчики копятся в процессе и раз в STATS_FLUSH_INTERVAL секунд,
+    а также при выходе из процесса сбрасываются в общее хранилище,
+    чтобы их видели все воркеры.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._stats_flushed = time.monotonic()
+        _stats_caches.add(self)
+
+    def _count(self, keys, found):
+        with self._stats_lock:
+            for key in keys:
+                kind = "hits" if key in found else "misses"
+                self._stats[(key_prefix(key), kind)] += 1
+            if not stats_due(self):
+                return
+            counts, self._stats = self._stats, Counter()
+            self._stats_flushed = time.monotonic()
+        self.write_stats(counts)
+
+    def flush_stats(self):
+        with self._stats_lock:
+            counts, self._stats = self._stats, Counter()
+            self._stats_flushed = time.monotonic()
+        if counts:
+            self.write_stats(counts)
+
+    def get(self, key, default=None, version=None):
+        found = self._get_many([key], version=version)
+        self._count([key], found)
+        return found.get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._get_many(keys, version=version)
+        self._count(keys, found)
+        return found
+
+    def _get_many(self, keys, version=None):
+        """Чтение без учёта в статистике."""
+        raise NotImplementedError
+
+    def write_stats(self, counts):
+        raise NotImplementedError
+
+    def read_stats(self):
+        """Словарь {префикс: {"hits": ..., "misses": ...}}."""
+        raise NotImplementedError
+
+    def reset_stats(self):
+        raise NotImplementedError
+
+
+class SQLitePool(threading.local):
+    """
+    Соединения с файлом кеша, по одному на поток и файл.
+
+    Соединение переживает запрос и закрывается только при смене
+    процесса, например после fork воркера gunicorn.
+    """
+
+    def __init__(self):
+        self.connections = {}
+        self.pid = os.getpid()
+
+    def connection(self, path):
+        if self.pid != os.getpid():
+            self.connections = {}
+            self.pid = os.getpid()
+        connection = self.connections.get(path)
+        if connection is None:
+            connection = sqlite3.connect(
+                path, timeout=10, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.connections[path] = connection
+        return connection
+
+
+_pool = SQLitePool()
+_schema_ready = set()
+
+
+class SQLiteCache(StatsMixin, BaseCache):
+    """
+    Общий для всех процессов кеш в отдельном файле SQLite.
+
+    Работает без сети, сжимает крупные значения и ведёт
+    статистику попаданий по префиксам ключей.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._sets = 0
+
+    @property
+    def _db(self):
+        connection = _pool.connection(self.path)
+        if self.path not in _schema_ready:
+            connection.executescript(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "compressed INTEGER NOT NULL, expires REAL);"
+                "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);"
+                "CREATE TABLE IF NOT EXISTS stats ("
+                "prefix TEXT, kind TEXT, count INTEGER NOT NULL, "
+                "PRIMARY KEY (prefix, kind));"
+            )
+            _schema_ready.add(self.path)
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _rows(self, items, timeout):
+        expires = self.get_backend_timeout(timeout)
+        for key, value in items:
+            data, compressed = dumps(value)
+            yield key, data, compressed, expires
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute(
+            "DELETE FROM cache WHERE key = ? AND expires <= ?",
+            (key, time.time()),
+        )
+        cursor = db.executemany(
+            "INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)",
+            self._rows([(key, value)], timeout),
+        )
+        return cursor.rowcount > 0
+
+    def _get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        if not made:
+            return {}
+        placeholders = ", ".join("?" * len(made))
+        rows = self._db.execute(
+            "SELECT key, value, compressed FROM cache "
+            f"WHERE key IN ({placeholders}) "
+            "AND (expires IS NULL OR expires > ?)",
+            [*made, time.time()],
+        )
+        return {
+            made[key]: loads(value, compressed)
+            for key, value, compressed in rows
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (self._key(key, version), value) for key, value in data.items()
+        ]
+        self._db.executemany(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+            self._rows(items, timeout),
+        )
+        self._sets += len(items)
+        if self._sets >= CULL_EVERY:
+            self._sets = 0
+            self._cull()
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        cursor = self._db.execute(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (expires, self._key(key, version), time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        self._db.executemany(
+            "DELETE FROM cache WHERE key = ?",
+            [(self._key(key, version),) for key in keys],
+        )
+
+    def has_key(self, key, version=None):
+        return bool(self._get_many([key], version=version))
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Соединение остаётся в пуле и переиспользуется следующим запросом.
+        pass
+
+    def _cull(self):
+        db = self._db
+        db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        (count,) = db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self._max_entries:
+            db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                (count // self._cull_frequency,),
+            )
+
+    def write_stats(self, counts):
+        self._db.executemany(
+            "INSERT INTO stats VALUES (?, ?, ?) "
+            "ON CONFLICT (prefix, kind) DO UPDATE "
+            "SET count = count + excluded.count",
+            [(*prefix_kind, count) for prefix_kind, count in counts.items()],
+        )
+
+    def read_stats(self):
+        stats = {}
+        for prefix, kind, count in self._db.execute(
+            "SELECT prefix, kind, count FROM stats"
+        ):
+            stats.setdefault(prefix, {"hits": 0, "misses": 0})[kind] = count
+        return stats
+
+    def reset_stats(self):
+        self._db.execute("DELETE FROM stats")
+
+
+try:
+    from django_redis.cache import RedisCache as BaseRedisCache
+except ImportError:
+    BaseRedisCache = None
+
+
+if BaseRedisCache is not None:
+
+    class RedisCache(StatsMixin, BaseRedisCache):
+        """
+        Кеш django-redis со статистикой по префиксам.
+
+        Пул соединений и сжатие настраиваются его OPTIONS.
+        """
+
+        stats_key = "cache_stats"
+
+        def _get_many(self, keys, version=None):
+            return BaseRedisCache.get_many(self, keys, version=version)
+
+        def _client(self):
+            return self.client.get_client(write=True)
+
+        def write_stats(self, counts):
+            pipeline = self._client().pipeline()
+            for (prefix, kind), count in counts.items():
+                field = f"{prefix}{STATS_KEY_SEPARATOR}{kind}"
+                pipeline.hincrby(self.make_key(self.stats_key), field, count)
+            pipeline.execute()
+
+        def read_stats(self):
+            stats = {}
+            values = self._client().hgetall(self.make_key(self.stats_key))
+            for field, count in values.items():
+                prefix, kind = field.decode().rsplit(STATS_KEY_SEPARATOR, 1)
+                stats.setdefault(prefix, {"hits": 0, "misses": 0})
+                stats[prefix][kind] = int(count)
+            return stats
+
+        def reset_stats(self):
+            self._client().delete(self.make_key(self.stats_key))
+
+
+class LocalLRU:
+    """Ограниченный по числу записей и времени жизни LRU в памяти."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            data, expires = item
+            if expires is not None and expires <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return data
+
+    def set(self, key, data, expires):
+        with self.lock:
+            self.entries[key] = (data, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кеш: LRU в памяти процесса перед общим кешем.
+
+    LOCATION — алиас общего кеша. Записи идут сквозь оба уровня,
+    локальная копия живёт не дольше LOCAL_TIMEOUT секунд, а для
+    префиксов из LOCAL_TIMEOUTS — своё время; 0 отключает локальный
+    уровень. Страницы лент лежат под ключами с версией, поэтому
+    после записи в Post или Group другие процессы просто не найдут
+    старый ключ, как только увидят новую версию.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = location
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 30)
+        self.local_timeouts = options.get("LOCAL_TIMEOUTS", {})
+        with _local_tiers_lock:
+            if location not in _local_tiers:
+                _local_tiers[location] = (
+                    LocalLRU(options.get("LOCAL_MAX_ENTRIES", 1000)),
+                    Counter(),
+                )
+        self.local, self.tier_stats = _local_tiers[location]
+        self._stats_flushed = time.monotonic()
+        _stats_caches.add(self)
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        return self.make_key(key, version=version)
+
+    def _local_expires(self, key, timeout=DEFAULT_TIMEOUT):
+        local_timeout = self.local_timeouts.get(
+            key_prefix(key), self.local_timeout
+        )
+        if not local_timeout:
+            return 0
+        expires = time.time() + local_timeout
+        if timeout is DEFAULT_TIMEOUT:
+            return expires
+        shared_expires = self.get_backend_timeout(timeout)
+        if shared_expires is None:
+            return expires
+        return min(expires, shared_expires)
+
+    def _remember(self, key, value, version, timeout=DEFAULT_TIMEOUT):
+        expires = self._local_expires(key, timeout)
+        local_key = self._local_key(key, version)
+        if expires == 0:
+            self.local.delete(local_key)
+            return
+        # Храним байты, а не объект: ответы из кеша дополняются
+        # заголовками и cookie, и это не должно попасть в копию.
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self.local.set(local_key, data, expires)
+
+    def _count(self, hits, misses):
+        with self.local.lock:
+            self.tier_stats["local", "hits"] += hits
+            self.tier_stats["local", "misses"] += misses
+        if stats_due(self):
+            self.flush_stats()
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            data = self.local.get(self._local_key(key, version))
+            if data is None:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(data)
+        self._count(len(found), len(missing))
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                self._remember(key, value, version)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(key, value, version, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            self._remember(key, value, version, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(key, value, version, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self._local_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self._local_key(key, version))
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self.local.delete(self._local_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self.local.get(self._local_key(key, version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def flush_stats(self):
+        with self.local.lock:
+            counts = Counter(
+                {
+                    (f"[{tier}]", kind): count
+                    for (tier, kind), count in self.tier_stats.items()
+                }
+            )
+            self.tier_stats.clear()
+        self._stats_flushed = time.monotonic()
+        if hasattr(self.shared, "flush_stats"):
+            self.shared.flush_stats()
+            if counts:
+                self.shared.write_stats(counts)
+
+    def read_stats(self):
+        return self.shared.read_stats()
+
+    def reset_stats(self):
+        self.tier_stats.clear()
+        self.shared.reset_stats()
@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Показывает попадания и промахи общего кеша по префиксам ключей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Обнулить статистику"
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, "read_stats"):
+            raise CommandError("Кеш не ведёт статистику попаданий")
+        if options["reset"]:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Статистика обнулена"))
+            return
+        cache.flush_stats()
+        stats = sorted(
+            cache.read_stats().items(),
+            key=lambda item: -(item[1]["hits"] + item[1]["misses"]),
+        )
+        self.stdout.write(
+            f"{'префикс':50} {'hits':>8} {'misses':>8} {'ratio':>6}"
+        )
+        for prefix, counts in stats:
+            total = counts["hits"] + counts["misses"]
+            ratio = counts["hits"] / total if total else 0
+            self.stdout.write(
+                f"{prefix[:50]:50} {counts['hits']:>8} "
+                f"{counts['misses']:>8} {ratio:>6.1%}"
+            )
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import get_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в файлы реплик "
+        "для локальной проверки чтения с реплик"
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Команда копирует только базы SQLite")
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError(
+                "Реплики не настроены: задайте YATUBE_REPLICA_DB"
+            )
+        primary.ensure_connection()
+        for alias in replicas:
+            connections[alias].close()
+            target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"Реплика {alias} обновлена"))
@@ -0,0 +1,96 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import routers
+from .query_stats import QueryStats, get_budget, logger
+
+
+class QueryBudgetMiddleware:
+    """
+    Замеряет число запросов, их повторы, время в базе и время
+    рендера для каждого view и сверяет их с QUERY_BUDGETS.
+
+    Временем рендера считается всё время ответа за вычетом базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        started = time.perf_counter()
+        # Все базы, включая реплики, считаются в один бюджет.
+        with ExitStack() as stack:
+            for alias_connection in connections.all():
+                stack.enter_context(alias_connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = stats.db_time * 1000
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = get_budget(view_name, request.method)
+        record = {
+            "view": view_name,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": stats.count,
+            "duplicates": stats.duplicates,
+            "db_ms": round(db_ms, 2),
+            "render_ms": round(total_ms - db_ms, 2),
+            "budget": budget,
+        }
+        if budget is not None and stats.count > budget:
+            logger.warning("Превышен бюджет запросов", extra=record)
+        else:
+            logger.info("Статистика запросов", extra=record)
+        response.query_stats = stats
+        response.query_record = record
+        if getattr(settings, "QUERY_STATS_HEADERS", settings.DEBUG):
+            response["X-View-Name"] = view_name or ""
+            response["X-Query-Count"] = stats.count
+            response["X-Duplicate-Queries"] = stats.duplicates
+            response["Server-Timing"] = (
+                f"db;dur={db_ms:.2f}, render;dur={total_ms - db_ms:.2f}"
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Отправляет чтения view из REPLICA_VIEWS на реплики.
+
+    После запроса с записью ставит cookie, и следующие
+    REPLICA_PIN_SECONDS секунд этот клиент читает из основной базы,
+    чтобы сразу видеть свои изменения несмотря на отставание реплик.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        try:
+            response = self.get_response(request)
+            if routers.has_writes():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE,
+                    "1",
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite="Lax",
+                )
+            return response
+        finally:
+            routers.reset()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in ("GET", "HEAD")
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        ):
+            routers.use_replica()
@@ -6,3 +6,32 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class CountersModel(models.Model):
+    """
+    Модель с денормализованными счётчиками.
+
+    Счётчики меняются только через F()-выражения, поэтому обычный
+    save() существующей записи их не перезаписывает.
+    """
+
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
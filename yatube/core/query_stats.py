@@ -0,0 +1,43 @@
+import logging
+import time
+
+from django.conf import settings
+
+
+logger = logging.getLogger("core.query_budget")
+
+
+class QueryStats:
+    """
+    Обёртка для connection.execute_wrapper: считает запросы,
+    их повторы и время в базе без DEBUG и debug_toolbar.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries.append((sql, repr(params)))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duplicates(self):
+        return self.count - len(set(self.queries))
+
+
+def get_budget(view_name, method=None):
+    """
+    Бюджет view: ключ (view_name, method) задаёт отдельный бюджет
+    для метода, например для записей в API, иначе берётся view_name.
+    """
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    return budgets.get((view_name, method), budgets.get(view_name))
@@ -0,0 +1,45 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+_state = threading.local()
+
+
+def get_replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def use_replica():
+    """Направляет чтения текущего запроса на случайную реплику."""
+    replicas = get_replicas()
+    _state.replica = random.choice(replicas) if replicas else None
+
+
+def reset():
+    _state.replica = None
+    _state.wrote = False
+
+
+def has_writes():
+    return getattr(_state, "wrote", False)
+
+
+class ReplicaRouter:
+    """
+    Чтения идут на реплику, только если её выбрал middleware
+    для view из REPLICA_VIEWS, все записи — на основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, "replica", None)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
@@ -1,4 +1,25 @@
-from django.test import Client, TestCase
+import os
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import cache as core_cache
+from core import routers
+from core.cache import LocalLRU, SQLiteCache, TieredCache
+from posts.models import Post
+
+
+User = get_user_model()
 
 
 class TestCoreViews(TestCase):
@@ -11,3 +32,266 @@ class TestCoreViews(TestCase):
         """Проверяем, что кастомная 404 ошибка использует нужный шаблон."""
         response = self.guest_client.get("/abcdefg/")
         self.assertTemplateUsed(response, "core/404.html")
+
+    @override_settings(QUERY_STATS_HEADERS=True)
+    def test_core_query_stats_headers(self):
+        """Проверяем, что ответ содержит статистику запросов view."""
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertEqual(response["X-View-Name"], "posts:index")
+        self.assertEqual(
+            int(response["X-Query-Count"]), response.query_stats.count
+        )
+        self.assertIn("X-Duplicate-Queries", response)
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+    def test_core_query_budget_exceeded_logged(self):
+        """Проверяем, что превышение бюджета пишется в лог."""
+        cache.clear()
+        with override_settings(QUERY_BUDGETS={"posts:index": 0}):
+            with self.assertLogs("core.query_budget", "WARNING") as logs:
+                self.guest_client.get(reverse("posts:index"))
+        self.assertEqual(logs.records[0].view, "posts:index")
+
+    def test_core_tests_use_temporary_cache(self):
+        """Проверяем, что тесты не чистят кеш рядом с базой."""
+        location = settings.CACHES["shared"]["LOCATION"]
+        self.assertFalse(location.startswith(settings.BASE_DIR))
+
+
+class TestCoreReplicaRouting(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Writer")
+        cls.post = Post.objects.create(text="Пост", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_core_router_sends_writes_to_primary(self):
+        """Проверяем, что чтения идут на выбранную реплику, записи — нет."""
+        router = routers.ReplicaRouter()
+        with override_settings(DATABASE_REPLICAS=["replica"]):
+            routers.reset()
+            self.assertIsNone(router.db_for_read(User))
+            routers.use_replica()
+            self.assertEqual(router.db_for_read(User), "replica")
+            self.assertFalse(routers.has_writes())
+            self.assertEqual(router.db_for_write(User), "default")
+            self.assertTrue(routers.has_writes())
+            routers.reset()
+
+    def read_aliases(self, url):
+        """
+        Считает чтения запроса по базам, которые выбрал роутер.
+        Реплика в тестах не настроена, поэтому сами запросы
+        всё равно выполняются в основной базе.
+        """
+        aliases = Counter()
+        db_for_read = routers.ReplicaRouter.db_for_read
+
+        def count(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            aliases[alias or "default"] += 1
+
+        with override_settings(DATABASE_REPLICAS=["replica"]):
+            with mock.patch.object(
+                routers.ReplicaRouter, "db_for_read", count
+            ):
+                self.client.get(url)
+        return aliases
+
+    def test_core_read_views_use_replica(self):
+        """
+        Проверяем, что списки подписок читаются с реплики, а ленты,
+        которые кешируются под версией лент, и формы записи —
+        только из основной базы.
+        """
+        urls = {
+            reverse("posts:follow_index"): True,
+            reverse("posts:followers", args=[self.user.username]): True,
+            reverse("posts:index"): False,
+            reverse("posts:trending"): False,
+            reverse("posts:profile", args=[self.user.username]): False,
+            reverse("posts:post_detail", args=[self.post.pk]): False,
+            reverse("posts:post_create"): False,
+        }
+        for url, replica in urls.items():
+            with self.subTest(url=url):
+                aliases = self.read_aliases(url)
+                self.assertTrue(aliases["default"] or aliases["replica"])
+                self.assertEqual(bool(aliases["replica"]), replica)
+
+    def test_core_write_pins_client_to_primary(self):
+        """
+        Проверяем, что после записи клиент на время
+        читает ленты из основной базы.
+        """
+        response = self.client.post(
+            reverse("posts:post_create"), {"text": "Новый пост"}
+        )
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.REPLICA_PIN_SECONDS)
+        with mock.patch.object(routers, "use_replica") as use:
+            self.client.get(reverse("posts:follow_index"))
+        use.assert_not_called()
+
+
+class TestCoreSQLiteCache(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.cache = SQLiteCache(
+            os.path.join(directory, "cache.sqlite3"), {}
+        )
+
+    def test_core_cache_roundtrip_and_expiry(self):
+        """Проверяем запись, чтение, add и истечение ключей."""
+        self.cache.set("feed:a", {"value": 1})
+        self.cache.set_many({"feed:b": 2, "feed:c": 3}, timeout=-1)
+        self.assertEqual(self.cache.get("feed:a"), {"value": 1})
+        self.assertEqual(
+            self.cache.get_many(["feed:a", "feed:b"]),
+            {"feed:a": {"value": 1}},
+        )
+        self.assertFalse(self.cache.add("feed:a", 5))
+        self.assertTrue(self.cache.add("feed:b", 5))
+        self.assertEqual(self.cache.get("feed:b"), 5)
+        self.cache.delete("feed:a")
+        self.assertIsNone(self.cache.get("feed:a"))
+
+    def test_core_cache_compresses_large_values(self):
+        """Проверяем, что крупные значения хранятся сжатыми."""
+        page = "<div>пост</div>" * 1000
+        self.cache.set("feed_page:big", page)
+        self.cache.set("feed_version:index", 1)
+        rows = dict(
+            self.cache._db.execute("SELECT key, compressed FROM cache")
+        )
+        self.assertEqual(sorted(rows.values()), [0, 1])
+        self.assertEqual(self.cache.get("feed_page:big"), page)
+
+    def test_core_cache_stats_by_prefix(self):
+        """Проверяем, что попадания и промахи считаются по префиксам."""
+        self.cache.set("post_card:1", "карточка")
+        self.cache.get_many(["post_card:1", "post_card:2"])
+        self.cache.get("feed_version:index")
+        self.cache.flush_stats()
+        self.assertEqual(
+            self.cache.read_stats(),
+            {
+                "post_card": {"hits": 1, "misses": 1},
+                "feed_version": {"hits": 0, "misses": 1},
+            },
+        )
+        output = StringIO()
+        with mock.patch(
+            "core.management.commands.cache_stats.cache", self.cache
+        ):
+            call_command("cache_stats", stdout=output)
+        self.assertIn("50.0%", output.getvalue())
+
+    def test_core_cache_stats_flushed_without_later_reads(self):
+        """
+        Проверяем, что счётчики сбрасываются в конце запроса, если
+        копятся дольше интервала, и при выходе из процесса, а не
+        только при следующем чтении.
+        """
+        self.cache.get("post_card:1")
+        request_finished.send(sender=None)
+        self.assertEqual(self.cache.read_stats(), {})
+        with mock.patch.object(core_cache, "STATS_FLUSH_INTERVAL", 0):
+            request_finished.send(sender=None)
+        self.assertEqual(
+            self.cache.read_stats(), {"post_card": {"hits": 0, "misses": 1}}
+        )
+        self.cache.get("post_card:1")
+        core_cache.flush_all_stats()
+        self.assertEqual(
+            self.cache.read_stats(), {"post_card": {"hits": 0, "misses": 2}}
+        )
+
+
+class TestCoreTieredCache(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        caches_setting = {
+            "tier_shared": {
+                "BACKEND": "core.cache.SQLiteCache",
+                "LOCATION": os.path.join(directory, "cache.sqlite3"),
+            },
+            "default": settings.CACHES["default"],
+        }
+        override = override_settings(CACHES=caches_setting)
+        override.enable()
+        self.addCleanup(override.disable)
+        options = {
+            "LOCAL_MAX_ENTRIES": 3,
+            "LOCAL_TIMEOUTS": {"feed_version": 0},
+        }
+        self.worker = TieredCache("tier_shared", {"OPTIONS": options})
+        self.other = TieredCache("tier_shared", {"OPTIONS": options})
+        # У второго «воркера» своя память процесса.
+        self.other.local = LocalLRU(3)
+        self.worker.clear()
+
+    def test_core_tiered_cache_serves_local_copies(self):
+        """
+        Проверяем, что повторное чтение идёт из памяти процесса
+        и изменения полученного объекта не портят копию.
+        """
+        self.worker.set("feed_page:1", {"headers": []})
+        self.worker.get("feed_page:1")["headers"].append("Set-Cookie")
+        with mock.patch.object(self.worker.shared, "get_many") as shared:
+            self.assertEqual(self.worker.get("feed_page:1"), {"headers": []})
+        shared.assert_not_called()
+
+    def test_core_tiered_cache_versions_propagate(self):
+        """
+        Проверяем, что версия ленты, сдвинутая другим воркером,
+        видна сразу, а старые страницы не используются.
+        """
+        self.worker.set("feed_version:index", 1)
+        self.worker.set("feed_page:1:index", "старая страница")
+        self.other.set("feed_version:index", 2)
+        version = self.worker.get("feed_version:index")
+        self.assertEqual(version, 2)
+        self.assertIsNone(self.worker.get(f"feed_page:{version}:index"))
+
+    def test_core_tiered_cache_deleted_keys_shared(self):
+        """
+        Проверяем, что ключи, которые сбрасываются удалением, а не
+        новой версией, не остаются в памяти другого воркера.
+        """
+        options = settings.CACHES["default"]["OPTIONS"]
+        worker = TieredCache("tier_shared", {"OPTIONS": options})
+        other = TieredCache("tier_shared", {"OPTIONS": options})
+        other.local = LocalLRU(3)
+        for key in ("timeline_celebrities", "following:1"):
+            with self.subTest(key=key):
+                worker.set(key, {1})
+                self.assertEqual(other.get(key), {1})
+                self.assertEqual(worker.get(key), {1})
+                other.delete(key)
+                self.assertIsNone(worker.get(key))
+
+    def test_core_tiered_cache_lru_bounded(self):
+        """Проверяем, что локальный уровень вытесняет старые ключи."""
+        for number in range(5):
+            self.worker.set(f"post_card:{number}", number)
+        self.assertEqual(len(self.worker.local.entries), 3)
+        self.assertEqual(self.worker.get("post_card:0"), 0)
+
+    def test_core_tiered_cache_tier_stats(self):
+        """Проверяем, что попадания в каждый уровень попадают в отчёт."""
+        self.worker.reset_stats()
+        self.other.set("post_card:1", "карточка")
+        self.worker.get("post_card:1")
+        self.worker.get("post_card:1")
+        self.worker.get("post_card:2")
+        self.worker.flush_stats()
+        stats = self.worker.read_stats()
+        self.assertEqual(stats["[local]"], {"hits": 1, "misses": 2})
+        self.assertEqual(stats["post_card"], {"hits": 1, "misses": 1})
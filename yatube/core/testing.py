@@ -0,0 +1,24 @@
+from .query_stats import get_budget
+
+
+class QueryBudgetMixin:
+    """Проверки бюджета запросов для TestCase."""
+
+    def assertWithinQueryBudget(self, response):
+        record = response.query_record
+        budget = get_budget(record["view"], record["method"])
+        self.assertIsNotNone(
+            budget, f"Для {record['view']} не задан бюджет запросов"
+        )
+        queries = "\n".join(sql for sql, _ in response.query_stats.queries)
+        self.assertLessEqual(
+            record["queries"],
+            budget,
+            f"{record['view']}: {record['queries']} запросов "
+            f"при бюджете {budget}:\n{queries}",
+        )
+        self.assertEqual(
+            record["duplicates"],
+            0,
+            f"{record['view']}: повторяющиеся запросы:\n{queries}",
+        )
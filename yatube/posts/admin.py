@@ -1,14 +1,161 @@
-from django.contrib import admin
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
 
-from .models import Comment, Follow, Group, Post
+from . import bulk, counters, search
+from .models import Comment, Follow, Group, Post, User
 
 
-class PostAdmin(admin.ModelAdmin):
+# Сколько найденных постов показывает поиск в админке.
+ADMIN_SEARCH_LIMIT = 1000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Для списка без фильтров берёт число строк из статистики базы,
+    если таблица больше ROW_COUNT_ESTIMATE_THRESHOLD строк.
+    """
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = counters.estimate_rows(self.object_list.model)
+            threshold = settings.ROW_COUNT_ESTIMATE_THRESHOLD
+            if estimate is not None and estimate > threshold:
+                return estimate
+        return self.object_list.count()
+
+
+class TargetGroupActionForm(ActionForm):
+    target_group = forms.ModelChoiceField(
+        Group.objects.all(), required=False, label="Группа"
+    )
+
+
+def target_group(request):
+    """Группа, выбранная рядом со списком действий."""
+    form = TargetGroupActionForm(request.POST)
+    # Поле action без вариантов не проходит проверку, нужна только группа.
+    form.is_valid()
+    return form.cleaned_data.get("target_group")
+
+
+def confirm_authors_action(modeladmin, request, queryset, question):
+    """
+    Страница подтверждения для действий над всеми записями авторов
+    выбранных строк, как у стандартного удаления.
+    """
+    context = {
+        **modeladmin.admin_site.each_context(request),
+        "title": "Вы уверены?",
+        "question": question,
+        "authors": User.objects.filter(pk__in=queryset.values("author")),
+        "selected": queryset.values_list("pk", flat=True),
+        "action": request.POST["action"],
+        "opts": modeladmin.model._meta,
+    }
+    return TemplateResponse(
+        request, "admin/posts/confirm_authors_action.html", context
+    )
+
+
+def author_ids(queryset):
+    return set(queryset.values_list("author", flat=True).distinct())
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр по имени пользователя через строку ввода: стандартный
+    фильтр по внешнему ключу выводит в боковую панель всех
+    пользователей.
+    """
+
+    template = "admin/input_filter.html"
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # Без вариантов Django не показывает фильтр.
+        return ((),)
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice["query_parts"] = [
+            (key, value)
+            for key, value in changelist.params.items()
+            if key not in (self.parameter_name, PAGE_VAR)
+        ]
+        yield all_choice
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value().strip()})
+        return queryset
+
+
+class UserFilter(InputFilter):
+    title = "подписчик"
+    parameter_name = "user"
+    lookup = "user__username"
+
+
+class AuthorFilter(InputFilter):
+    title = "автор"
+    parameter_name = "author"
+    lookup = "author__username"
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного COUNT(*) и без перечисления связанных строк."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = "-пусто-"
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ("pk", "text", "pub_date", "author", "group")
+    list_select_related = ("author", "group")
     search_fields = ("text",)
-    list_filter = ("pub_date",)
-    list_editable = ("group",)
-    empty_value_display = "-пусто-"
+    list_filter = ("pub_date", AuthorFilter)
+    date_hierarchy = "pub_date"
+    raw_id_fields = ("author",)
+    autocomplete_fields = ("group",)
+    action_form = TargetGroupActionForm
+    actions = ("move_to_group", "delete_author_posts")
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет через поисковый индекс, а не LIKE по всей таблице."""
+        if not search_term:
+            return queryset, False
+        ids, _ = search.get_backend().search(search_term, ADMIN_SEARCH_LIMIT)
+        return queryset.filter(pk__in=ids), False
+
+    def move_to_group(self, request, queryset):
+        group = target_group(request)
+        if group is None:
+            self.message_user(request, "Выберите группу", messages.ERROR)
+            return None
+        moved = bulk.move_posts(queryset, group)
+        self.message_user(request, f"Перенесено в «{group}» постов: {moved}")
+        return None
+
+    move_to_group.short_description = "Перенести в выбранную группу"
+
+    def delete_author_posts(self, request, queryset):
+        if not request.POST.get("post"):
+            return confirm_authors_action(
+                self, request, queryset, "Удалить все посты этих авторов?"
+            )
+        deleted = bulk.delete_posts_by_authors(author_ids(queryset))
+        self.message_user(request, f"Удалено постов: {deleted}")
+        return None
+
+    delete_author_posts.short_description = "Удалить все посты авторов"
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -17,20 +164,55 @@ class GroupAdmin(admin.ModelAdmin):
     list_editable = ("title", "slug", "description")
     prepopulated_fields = {"slug": ("title",)}
     empty_value_display = "-пусто-"
+    action_form = TargetGroupActionForm
+    actions = ("merge_groups",)
+
+    def merge_groups(self, request, queryset):
+        target = target_group(request)
+        if target is None:
+            self.message_user(request, "Выберите группу", messages.ERROR)
+            return None
+        moved = bulk.merge_groups(queryset, target)
+        self.message_user(
+            request, f"Группы объединены в «{target}», перенесено: {moved}"
+        )
+        return None
+
+    merge_groups.short_description = "Объединить в выбранную группу"
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ("pk", "post", "author", "text")
+    list_select_related = ("post", "author")
     search_fields = ("text",)
-    list_filter = ("pub_date",)
+    list_filter = ("pub_date", AuthorFilter)
+    date_hierarchy = "pub_date"
     list_editable = ("text",)
-    empty_value_display = "-пусто-"
+    raw_id_fields = ("post", "author")
+    actions = ("delete_author_comments",)
+
+    def delete_author_comments(self, request, queryset):
+        if not request.POST.get("post"):
+            return confirm_authors_action(
+                self,
+                request,
+                queryset,
+                "Удалить все комментарии этих авторов?",
+            )
+        deleted = bulk.delete_comments_by_authors(author_ids(queryset))
+        self.message_user(request, f"Удалено комментариев: {deleted}")
+        return None
 
+    delete_author_comments.short_description = (
+        "Удалить все комментарии авторов"
+    )
 
-class FollowAdmin(admin.ModelAdmin):
+
+class FollowAdmin(LargeTableAdmin):
     list_display = ("pk", "user", "author")
-    list_filter = ("user",)
-    empty_value_display = "-пусто-"
+    list_select_related = ("user", "author")
+    list_filter = (UserFilter, AuthorFilter)
+    raw_id_fields = ("user", "author")
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,192 @@
+import logging
+
+from django.db import connection, models, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import counters, page_cache, search, timeline
+from .models import Comment, Post
+
+
+# Не больше лимита параметров SQLite в одном запросе.
+BULK_BATCH_SIZE = 500
+
+logger = logging.getLogger("posts.bulk")
+
+
+def id_batches(queryset, size=None):
+    """
+    id строк queryset пачками по возрастанию: следующая пачка
+    выбирается по ключу после последнего id, без OFFSET.
+    """
+    size = size or BULK_BATCH_SIZE
+    last = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:size]
+        )
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def log_progress(done, total):
+    logger.info("Обработано %s из %s", done, total)
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _delete_where(model, column, values):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {model._meta.db_table} "
+            f"WHERE {column} IN ({_placeholders(values)})",
+            list(values),
+        )
+        return cursor.rowcount
+
+
+def delete_ids(model, ids):
+    """
+    Удаляет строки по id одним DELETE, без загрузки объектов
+    и сигналов. Зависимые строки удаляются так же (CASCADE)
+    или отвязываются (SET_NULL).
+    """
+    for relation in model._meta.related_objects:
+        related = relation.related_model
+        field = relation.field
+        if relation.on_delete is models.SET_NULL:
+            related._base_manager.filter(**{f"{field.name}__in": ids}).update(
+                **{field.name: None}
+            )
+        elif relation.on_delete is not models.CASCADE:
+            continue
+        elif related._meta.related_objects:
+            rows = related._base_manager.filter(**{f"{field.name}__in": ids})
+            for related_ids in id_batches(rows):
+                delete_ids(related, related_ids)
+        else:
+            _delete_where(related, field.column, ids)
+    return _delete_where(model, model._meta.pk.column, ids)
+
+
+def _feed_scopes(posts):
+    """Ленты, в которых показаны посты из queryset posts."""
+    scopes = {page_cache.INDEX_SCOPE, page_cache.TRENDING_SCOPE}
+    for username, slug in posts.values_list(
+        "author__username", "group__slug"
+    ).distinct():
+        scopes.add(page_cache.author_scope(username))
+        if slug:
+            scopes.add(page_cache.group_scope(slug))
+    return scopes
+
+
+def _run(queryset, handle_batch, progress):
+    """Обрабатывает queryset пачками, каждую в своей транзакции."""
+    total = queryset.count()
+    done = 0
+    scopes = set()
+    for ids in id_batches(queryset):
+        with transaction.atomic():
+            scopes |= handle_batch(ids)
+        done += len(ids)
+        (progress or log_progress)(done, total)
+    if scopes:
+        page_cache.bump_feeds(*scopes)
+        counters.invalidate_row_counts(counters.INDEX_COUNT_KEY)
+    return done
+
+
+def move_posts(posts, group, progress=None):
+    """Переносит посты в группу group (None — убрать из групп)."""
+
+    def handle_batch(ids):
+        batch = Post.objects.filter(pk__in=ids)
+        scopes = _feed_scopes(batch)
+        old_groups = (
+            batch.filter(group__isnull=False)
+            .values_list("group")
+            .annotate(moved=Count("pk"))
+            .order_by()
+        )
+        for group_id, moved in old_groups:
+            counters.change_group_posts(group_id, -moved)
+        # updated сдвигает версию закешированных карточек постов.
+        batch.update(group=group, updated=timezone.now())
+        if group is not None:
+            counters.change_group_posts(group.pk, len(ids))
+            scopes.add(page_cache.group_scope(group.slug))
+        search.get_backend().index_many(ids)
+        return scopes
+
+    return _run(posts.exclude(group=group), handle_batch, progress)
+
+
+def merge_groups(groups, target, progress=None):
+    """Переносит посты групп в target и удаляет опустевшие группы."""
+    sources = groups.exclude(pk=target.pk)
+    moved = move_posts(
+        Post.objects.filter(group__in=sources), target, progress
+    )
+    for group in sources:
+        group.delete()
+    return moved
+
+
+def delete_comments_by_authors(author_ids, progress=None):
+    def handle_batch(ids):
+        batch = Comment.objects.filter(pk__in=ids)
+        per_post = list(
+            batch.values_list("post").annotate(deleted=Count("pk")).order_by()
+        )
+        post_ids = [post_id for post_id, _ in per_post]
+        scopes = _feed_scopes(Post.objects.filter(pk__in=post_ids))
+        delete_ids(Comment, ids)
+        for post_id, deleted in per_post:
+            counters.change_post_comments(post_id, -deleted)
+        return scopes
+
+    return _run(
+        Comment.objects.filter(author__in=author_ids), handle_batch, progress
+    )
+
+
+def delete_posts_by_authors(author_ids, progress=None):
+    """
+    Удаляет все посты авторов вместе с комментариями, записями лент
+    и рейтинга, поправляя счётчики авторов и групп.
+    """
+
+    def handle_batch(ids):
+        batch = Post.objects.filter(pk__in=ids)
+        scopes = _feed_scopes(batch)
+        per_author = list(
+            batch.values_list("author")
+            .annotate(deleted=Count("pk"))
+            .order_by()
+        )
+        per_group = list(
+            batch.filter(group__isnull=False)
+            .values_list("group")
+            .annotate(deleted=Count("pk"))
+            .order_by()
+        )
+        delete_ids(Post, ids)
+        search.get_backend().remove_many(ids)
+        for author_id, deleted in per_author:
+            counters.change_author_stats(author_id, "posts_count", -deleted)
+        for group_id, deleted in per_group:
+            counters.change_group_posts(group_id, -deleted)
+        return scopes
+
+    deleted = _run(
+        Post.objects.filter(author__in=author_ids), handle_batch, progress
+    )
+    timeline.invalidate_follower_counts(author_ids)
+    return deleted
@@ -0,0 +1,121 @@
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Group, Post
+
+
+# Числа записей лент без счётчиков в моделях: их сбрасывают
+# записи, которые меняют ленту.
+INDEX_COUNT_KEY = "row_count:index"
+
+
+def _change(queryset, field, delta):
+    """Атомарно сдвигает счётчик, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_author_stats(user_id, field, delta):
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if not _change(stats, field, delta) and delta > 0:
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        _change(stats, field, delta)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), "comments_count", delta)
+
+
+def change_group_posts(group_id, delta):
+    _change(Group.objects.filter(pk=group_id), "posts_count", delta)
+
+
+def timeline_count_key(user_id):
+    return f"row_count:timeline:{user_id}"
+
+
+def invalidate_row_counts(*keys):
+    cache.delete_many(keys)
+
+
+def estimate_rows(model):
+    """
+    Оценка числа строк таблицы из статистики планировщика
+    (sqlite_stat1 после ANALYZE, pg_class в PostgreSQL)
+    или None, если статистики нет.
+    """
+    table = model._meta.db_table
+    queries = {
+        "sqlite": "SELECT stat FROM sqlite_stat1 WHERE tbl = %s",
+        "postgresql": "SELECT reltuples::bigint FROM pg_class "
+        "WHERE relname = %s",
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(queries[connection.vendor], [table])
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    # В sqlite_stat1 первое число stat — строки таблицы или индекса.
+    counts = [int(str(stat).split()[0]) for stat, in rows if stat]
+    return max(counts) if counts else None
+
+
+def author_stats(user):
+    """Счётчики пользователя; для новых пользователей — нулевые."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def _count(model, field, value_field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef(value_field)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def recount(apps=global_apps):
+    """
+    Пересчитывает все счётчики несколькими UPDATE по подзапросам.
+
+    Принимает реестр моделей, чтобы работать и из миграций.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    Group = apps.get_model("posts", "Group")
+    Post = apps.get_model("posts", "Post")
+
+    AuthorStats.objects.bulk_create(
+        (
+            AuthorStats(user_id=pk)
+            for pk in User.objects.filter(stats__isnull=True)
+            .values_list("pk", flat=True)
+            .iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    AuthorStats.objects.update(
+        posts_count=_count(Post, "author", "user"),
+        followers_count=_count(Follow, "author", "user"),
+        following_count=_count(Follow, "user", "user"),
+    )
+    Post.objects.update(comments_count=_count(Comment, "post", "pk"))
+    Group.objects.update(posts_count=_count(Post, "group", "pk"))
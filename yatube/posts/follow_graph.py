@@ -0,0 +1,42 @@
+from django.core.cache import cache
+
+from .models import Follow
+
+
+FOLLOWING_TIMEOUT = 60 * 60
+REQUEST_ATTRIBUTE = "_followed_author_ids"
+
+
+def following_key(user_id):
+    return f"following:{user_id}"
+
+
+def followed_author_ids(user):
+    """
+    Множество id авторов, на которых подписан пользователь.
+
+    Загружается один раз за запрос: результат запоминается
+    на объекте пользователя, а между запросами лежит в кеше.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, REQUEST_ATTRIBUTE, None)
+    if ids is None:
+        ids = cache.get(following_key(user.pk))
+        if ids is None:
+            ids = frozenset(
+                Follow.objects.filter(user=user).values_list(
+                    "author_id", flat=True
+                )
+            )
+            cache.set(following_key(user.pk), ids, FOLLOWING_TIMEOUT)
+        setattr(user, REQUEST_ATTRIBUTE, ids)
+    return ids
+
+
+def is_following(user, author):
+    return author.pk in followed_author_ids(user)
+
+
+def invalidate_following(user_id):
+    cache.delete(following_key(user_id))
@@ -0,0 +1,75 @@
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+POST_CARD_TEMPLATE = "posts/includes/post.html"
+POST_CARD_TIMEOUT = 60 * 60 * 24
+# Увеличиваем при изменении шаблона карточки поста.
+POST_CARD_VERSION = 3
+
+
+def _author_version_key(author_id):
+    return f"card_author:{author_id}"
+
+
+def author_card_versions(author_ids):
+    """
+    Версии карточек авторов: сдвигаются при смене имени, чтобы
+    не трогать сами посты. Недостающие заводятся одним add на автора.
+    """
+    keys = {_author_version_key(pk): pk for pk in author_ids}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), POST_CARD_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def post_card_key(post, author_version):
+    """
+    Ключ фрагмента: id поста, время его последнего изменения
+    и версия карточек автора.
+    """
+    return f"post_card:{post.pk}:{post.updated.timestamp()}:{author_version}"
+
+
+def get_post_cards(posts):
+    """
+    Возвращает словарь {id поста: html карточки}.
+
+    Все карточки страницы читаются из кеша одним get_many,
+    недостающие рендерятся и сохраняются одним set_many.
+    """
+    versions = author_card_versions({post.author_id for post in posts})
+    keys = {
+        post_card_key(post, versions[post.author_id]): post for post in posts
+    }
+    cards = cache.get_many(keys, version=POST_CARD_VERSION)
+    missing = {
+        key: render_to_string(POST_CARD_TEMPLATE, {"post": post})
+        for key, post in keys.items()
+        if key not in cards
+    }
+    if missing:
+        cache.set_many(
+            missing, POST_CARD_TIMEOUT, version=POST_CARD_VERSION
+        )
+        cards.update(missing)
+    return {post.pk: mark_safe(cards[key]) for key, post in keys.items()}
+
+
+def invalidate_post_card(post):
+    version = author_card_versions([post.author_id])[post.author_id]
+    cache.delete(post_card_key(post, version), version=POST_CARD_VERSION)
+
+
+def invalidate_author_cards(author):
+    """Сдвигает версию карточек всех постов автора."""
+    cache.set(
+        _author_version_key(author.pk), time.time_ns(), POST_CARD_TIMEOUT
+    )
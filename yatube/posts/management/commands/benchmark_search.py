@@ -0,0 +1,33 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.search import LikeSearchBackend, SQLiteFTSBackend
+
+
+BACKENDS = {"like": LikeSearchBackend, "fts5": SQLiteFTSBackend}
+
+
+class Command(BaseCommand):
+    help = "Сравнивает скорость поиска FTS5 и LIKE '%...%' на текущей базе"
+
+    def add_arguments(self, parser):
+        parser.add_argument("queries", nargs="+", help="Поисковые запросы")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--limit", type=int, default=10)
+
+    def handle(self, *args, **options):
+        for query in options["queries"]:
+            for name, backend_class in BACKENDS.items():
+                backend = backend_class()
+                timings = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    ids, _ = backend.search(query, options["limit"])
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{query!r:20} {name:5} "
+                    f"median={statistics.median(timings):.2f}ms "
+                    f"max={max(timings):.2f}ms found={len(ids)}"
+                )
@@ -0,0 +1,107 @@
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.seeding import Seeder, sample_pages
+
+
+# Доли пользователей, групп, комментариев и подписок
+# относительно числа постов при росте базы.
+SCALE = {"users": 0.05, "groups": 0.005, "comments": 2, "follows": 0.5}
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(share * (len(ordered) - 1)))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Наращивает базу до заданных размеров и замеряет задержку "
+        "и число запросов основных страниц, результат — JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000],
+            help="Число постов, до которого наращивается база",
+        )
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Очищать кеш перед каждым запросом",
+        )
+        parser.add_argument("--output", help="Файл для JSON с результатом")
+
+    def handle(self, *args, **options):
+        seeder = Seeder(seed=options["seed"])
+        results = []
+        for size in sorted(options["sizes"]):
+            missing = size - Post.objects.count()
+            if missing > 0:
+                seeder.seed(
+                    posts=missing,
+                    **{
+                        name: max(1, round(missing * share))
+                        for name, share in SCALE.items()
+                    },
+                )
+            results.append(
+                {
+                    "posts": Post.objects.count(),
+                    "views": self.measure(
+                        options["requests"], options["cold"]
+                    ),
+                }
+            )
+        report = json.dumps(
+            {"cold": options["cold"], "results": results}, indent=2
+        )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                output.write(report)
+        else:
+            self.stdout.write(report)
+
+    def measure(self, requests, cold):
+        pages, follower = sample_pages()
+        client = Client()
+        follow_client = Client()
+        if follower:
+            follow_client.force_login(follower)
+            pages["follow_index"] = reverse("posts:follow_index")
+        views = {}
+        for name, url in pages.items():
+            view_client = follow_client if name == "follow_index" else client
+            timings = []
+            queries = []
+            for _ in range(requests):
+                if cold:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    view_client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries.append(len(context.captured_queries))
+            views[name] = {
+                "url": url,
+                "p50_ms": round(statistics.median(timings), 2),
+                "p90_ms": round(percentile(timings, 0.9), 2),
+                "p99_ms": round(percentile(timings, 0.99), 2),
+                "queries": max(queries),
+            }
+        return views
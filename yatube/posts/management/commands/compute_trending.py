@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает рейтинг популярных постов; "
+        "запускается периодически, например из cron"
+    )
+
+    def handle(self, *args, **options):
+        count = compute_trending()
+        self.stdout.write(
+            self.style.SUCCESS(f"В рейтинге постов: {count}")
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import demote_celebrities
+
+
+class Command(BaseCommand):
+    help = (
+        "Снова раскладывает по лентам посты авторов, у которых стало "
+        "мало подписчиков; запускается периодически, например из cron"
+    )
+
+    def handle(self, *args, **options):
+        count = demote_celebrities()
+        self.stdout.write(
+            self.style.SUCCESS(f"Авторов снова в лентах: {count}")
+        )
@@ -0,0 +1,109 @@
+import re
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.seeding import sample_pages
+
+
+FULL_SCAN_RE = re.compile(r"^SCAN (TABLE )?(?P<table>\w+)")
+TEMP_SORT = "USE TEMP B-TREE"
+# Служебные таблицы SQLite, например статистика для оценки числа строк.
+SYSTEM_TABLE_RE = re.compile(r"\bFROM sqlite_\w+", re.IGNORECASE)
+# Сортировки, которые индексом не убрать: их объём ограничен.
+EXPECTED_SORTS = {
+    "follow_index": "не больше TIMELINE_LENGTH постов из ленты",
+    "search": "найденное FTS5 упорядочивается по релевантности",
+}
+
+
+class QueryCollector:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        is_select = sql.lstrip().upper().startswith("SELECT")
+        if is_select and not SYSTEM_TABLE_RE.search(sql):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def plan_problems(plan, allow_sort=False):
+    """Полные проходы по таблицам и сортировки во временном B-дереве."""
+    problems = []
+    for *_, detail in plan:
+        match = FULL_SCAN_RE.match(detail)
+        if match and "USING" not in detail and "VIRTUAL" not in detail:
+            problems.append(f"полный проход по {match.group('table')}")
+        if TEMP_SORT in detail and not allow_sort:
+            problems.append(detail)
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет EXPLAIN QUERY PLAN для запросов основных страниц "
+        "и сообщает о полных проходах по таблицам и сортировках без индекса"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Печатать планы всех запросов",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("EXPLAIN QUERY PLAN есть только в SQLite")
+        pages, follower = sample_pages()
+        client = Client()
+        follow_client = Client()
+        if follower:
+            follow_client.force_login(follower)
+            pages["follow_index"] = reverse("posts:follow_index")
+        if follower:
+            pages["following"] = reverse(
+                "posts:following", args=[follower.username]
+            )
+        if "profile" in pages:
+            pages["followers"] = pages["profile"] + "followers/"
+        if "post_detail" in pages:
+            pages["post_comments"] = pages["post_detail"] + "comments/"
+        pages["search"] = reverse("posts:search") + "?q=пост"
+        pages["trending"] = reverse("posts:trending")
+        failed = 0
+        for name, url in pages.items():
+            cache.clear()
+            collector = QueryCollector()
+            view_client = follow_client if name == "follow_index" else client
+            with connection.execute_wrapper(collector):
+                view_client.get(url)
+            for sql, params in collector.queries:
+                failed += self.explain(
+                    name, sql, params, options["verbose_plans"]
+                )
+        if failed:
+            raise CommandError(f"Запросов с неоптимальным планом: {failed}")
+        self.stdout.write(self.style.SUCCESS("Все запросы используют индексы"))
+
+    def explain(self, name, sql, params, verbose):
+        """Печатает план запроса, возвращает 1, если план плохой."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = cursor.fetchall()
+        problems = plan_problems(plan, name in EXPECTED_SORTS)
+        if problems:
+            self.stdout.write(
+                self.style.WARNING(f"{name}: {'; '.join(problems)}")
+            )
+            self.stdout.write(f"    {sql}")
+        elif verbose:
+            self.stdout.write(f"{name}: {sql}")
+        if problems or verbose:
+            for *_, detail in plan:
+                self.stdout.write(f"    | {detail}")
+        return int(bool(problems))
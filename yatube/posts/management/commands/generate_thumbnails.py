@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from posts.models import Post
+from posts.thumbnails import (
+    THUMBNAIL_FIELDS,
+    generate_renditions,
+    get_storage,
+    thumbnail_fields,
+)
+
+
+BATCH_SIZE = 500
+IMAGES_PER_TASK = 8
+
+
+class Command(BaseCommand):
+    help = "Создаёт недостающие версии картинок существующих постов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать версии, даже если файлы уже есть",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Число процессов, по умолчанию — по числу ядер",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").only(
+            "pk", "image", "updated", *THUMBNAIL_FIELDS
+        )
+        storage = get_storage()
+        changed = []
+        pending = []
+        for post in posts.iterator(chunk_size=BATCH_SIZE):
+            fields = thumbnail_fields(post)
+            if any(getattr(post, f) != v for f, v in fields.items()):
+                for field, value in fields.items():
+                    setattr(post, field, value)
+                # Новая версия карточки поста в кеше фрагментов.
+                post.updated = timezone.now()
+                changed.append(post)
+            if options["force"] or not storage.exists(post.thumbnail):
+                pending.append(post.image.name)
+        Post.objects.bulk_update(
+            changed, [*THUMBNAIL_FIELDS, "updated"], batch_size=BATCH_SIZE
+        )
+        created = 0
+        if pending:
+            # Дочерние процессы не должны наследовать открытое соединение.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+                results = pool.map(
+                    generate_renditions, pending, chunksize=IMAGES_PER_TASK
+                )
+                created = sum(results)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано картинок: {created} из {len(pending)}, "
+                f"обновлено постов: {len(changed)}"
+            )
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковый индекс постов"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            get_backend().reindex()
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс перестроен"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from posts.seeding import SEED_BATCH_SIZE, Seeder
+
+
+class Command(BaseCommand):
+    help = "Наполняет базу тестовыми пользователями, постами и подписками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--groups", type=int, default=10)
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--comments", type=int, default=2000)
+        parser.add_argument("--follows", type=int, default=1000)
+        parser.add_argument(
+            "--batch-size", type=int, default=SEED_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--seed", type=int, default=None, help="Seed генератора"
+        )
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            stdout=self.stdout,
+        )
+        seeder.seed(
+            users=options["users"],
+            groups=options["groups"],
+            posts=options["posts"],
+            comments=options["comments"],
+            follows=options["follows"],
+        )
+        self.stdout.write(self.style.SUCCESS("Готово"))
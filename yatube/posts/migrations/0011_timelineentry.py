@@ -0,0 +1,81 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    from posts import timeline
+
+    with schema_editor.connection.cursor() as cursor:
+        timeline.fill_timelines(
+            cursor,
+            apps.get_model("posts", "TimelineEntry"),
+            apps.get_model("posts", "Follow"),
+            apps.get_model("posts", "Post"),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0010_auto_20230130_1805"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimelineEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "pub_date",
+                    models.DateTimeField(verbose_name="Дата публикации поста"),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entries",
+                        to="posts.Post",
+                        verbose_name="Пост",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Читатель ленты",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись ленты подписок",
+                "verbose_name_plural": "Записи ленты подписок",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="timelineentry",
+            index=models.Index(
+                fields=["user", "-pub_date"], name="timeline_user_date_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="timelineentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "post"), name="uq_timeline_user_post"
+            ),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0011_timelineentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="updated",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения"
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:05
+
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+        "text, group_id UNINDEXED, author_id UNINDEXED, "
+        "tokenize = 'unicode61', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO posts_post_fts (rowid, text, group_id, author_id) "
+        "SELECT id, text, group_id, author_id FROM posts_post"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE posts_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0013_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0014_post_fts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="thumbnail",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=255,
+                verbose_name="Миниатюра картинки",
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="thumbnail_height",
+            field=models.PositiveSmallIntegerField(
+                editable=False, null=True, verbose_name="Высота миниатюры"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="thumbnail_width",
+            field=models.PositiveSmallIntegerField(
+                editable=False, null=True, verbose_name="Ширина миниатюры"
+            ),
+        ),
+    ]
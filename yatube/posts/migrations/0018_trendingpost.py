@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0017_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingPost",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending",
+                        serialize=False,
+                        to="posts.Post",
+                        verbose_name="Пост",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="Рейтинг")),
+            ],
+            options={
+                "verbose_name": "Популярный пост",
+                "verbose_name_plural": "Популярные посты",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="trendingpost",
+            index=models.Index(
+                fields=["-score", "-post"], name="trending_score_idx"
+            ),
+        ),
+    ]
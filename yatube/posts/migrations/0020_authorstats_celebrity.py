@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:09
+
+from django.db import migrations, models
+
+
+def reset_celebrities(apps, schema_editor):
+    from posts import timeline
+
+    timeline.reset_celebrities(
+        apps.get_model("posts", "AuthorStats"),
+        apps.get_model("posts", "Follow"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0019_comment_date_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="authorstats",
+            name="celebrity",
+            field=models.BooleanField(
+                db_index=True,
+                default=False,
+                editable=False,
+                verbose_name="Популярный автор",
+            ),
+        ),
+        migrations.RunPython(reset_celebrities, migrations.RunPython.noop),
+    ]
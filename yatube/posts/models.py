@@ -2,19 +2,24 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.urls import reverse
 
-from core.models import CreatedModel
+from core.models import CountersModel, CreatedModel
 
 
 User = get_user_model()
 SLICE_OF_THE_FOUND_POST = 15
 
 
-class Group(models.Model):
+class Group(CountersModel):
     title = models.CharField(max_length=200, verbose_name="Название группы")
     slug = models.SlugField(
         unique=True, verbose_name="Ссылка сайта после group/..."
     )
     description = models.TextField(verbose_name="Описание группы")
+    posts_count = models.PositiveIntegerField(
+        "Количество постов", default=0, editable=False
+    )
+
+    counter_fields = ("posts_count",)
 
     class Meta:
         verbose_name = "Группа"
@@ -24,7 +29,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(CreatedModel):
+class Post(CreatedModel, CountersModel):
     text = models.TextField(
         verbose_name="Текст поста",
         help_text="Текст поста, который увидят пользователи",
@@ -45,11 +50,38 @@ class Post(CreatedModel):
         help_text="Группа, к которой будет относиться запись",
     )
     image = models.ImageField("Картинка", upload_to="posts/", blank=True)
+    thumbnail = models.CharField(
+        "Миниатюра картинки", max_length=255, blank=True, editable=False
+    )
+    thumbnail_width = models.PositiveSmallIntegerField(
+        "Ширина миниатюры", null=True, editable=False
+    )
+    thumbnail_height = models.PositiveSmallIntegerField(
+        "Высота миниатюры", null=True, editable=False
+    )
+    updated = models.DateTimeField("Дата изменения", auto_now=True)
+    comments_count = models.PositiveIntegerField(
+        "Количество комментариев", default=0, editable=False
+    )
+
+    counter_fields = ("comments_count",)
 
     class Meta:
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
         ordering = ["-pub_date"]
+        # Ленты сортируются по ключу паджинатора (pub_date, id).
+        indexes = [
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_date_idx",
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_date_idx",
+            ),
+            models.Index(fields=["-pub_date", "-id"], name="post_date_idx"),
+        ]
 
     def __str__(self):
         return self.text[:SLICE_OF_THE_FOUND_POST]
@@ -57,6 +89,10 @@ class Post(CreatedModel):
     def get_absolute_url(self):
         return reverse("posts:profile", args=[self.author.username])
 
+    @property
+    def thumbnail_url(self):
+        return self.image.storage.url(self.thumbnail)
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -81,6 +117,13 @@ class Comment(CreatedModel):
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=["post", "pub_date"], name="comment_post_date_idx"
+            ),
+            # Для date_hierarchy в админке.
+            models.Index(fields=["pub_date"], name="comment_date_idx"),
+        ]
 
     def get_absolute_url(self):
         return reverse("posts:post_detail", args=[self.post.id])
@@ -108,3 +151,81 @@ class Follow(models.Model):
                 fields=["user", "author"], name="uq_user_author"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["author", "user"], name="follow_author_user_idx"
+            )
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Пользователь",
+    )
+    posts_count = models.PositiveIntegerField("Количество постов", default=0)
+    followers_count = models.PositiveIntegerField(
+        "Количество подписчиков", default=0
+    )
+    following_count = models.PositiveIntegerField(
+        "Количество подписок", default=0
+    )
+    # Посты популярного автора не раскладываются по лентам подписчиков.
+    celebrity = models.BooleanField(
+        "Популярный автор", default=False, db_index=True, editable=False
+    )
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Читатель ленты",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField("Дата публикации поста")
+
+    class Meta:
+        verbose_name = "Запись ленты подписок"
+        verbose_name_plural = "Записи ленты подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="uq_timeline_user_post"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date"], name="timeline_user_date_idx"
+            )
+        ]
+
+
+class TrendingPost(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending",
+        verbose_name="Пост",
+    )
+    score = models.FloatField("Рейтинг")
+
+    class Meta:
+        verbose_name = "Популярный пост"
+        verbose_name_plural = "Популярные посты"
+        indexes = [
+            models.Index(fields=["-score", "-post"], name="trending_score_idx")
+        ]
@@ -0,0 +1,173 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_cache_key
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+
+# Страницы живут долго: свежесть обеспечивает версия в ключе,
+# которую сдвигают записи в Post, Group, Comment и Follow.
+FEED_CACHE_TIMEOUT = 60 * 60
+REGENERATE_LOCK_TIMEOUT = 30
+# Версия, заведённая чтением, а не записью, живёт не дольше страниц:
+# иначе каждый запрос к несуществующей группе или профилю оставлял бы
+# в кеше вечный ключ. Истёкшая версия заводится заново и только новее.
+FEED_VERSION_TIMEOUT = FEED_CACHE_TIMEOUT
+INDEX_SCOPE = "index"
+TRENDING_SCOPE = "trending"
+
+
+def group_scope(slug):
+    return f"group:{slug}"
+
+
+def author_scope(username):
+    return f"author:{username}"
+
+
+def _version_key(scope):
+    return f"feed_version:{scope}"
+
+
+def _path_key(request, name):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"feed_page_{name}:{path}"
+
+
+def _feed_versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), FEED_VERSION_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return [versions[key] for key in keys]
+
+
+def feed_version(scopes):
+    """Возвращает общую версию набора лент, заводя недостающие."""
+    return ".".join(str(version) for version in _feed_versions(scopes))
+
+
+def feed_last_modified(scopes):
+    """
+    Время последнего изменения набора лент: версия — это момент
+    её сдвига в наносекундах.
+    """
+    newest = max(_feed_versions(scopes))
+    return datetime.fromtimestamp(newest / 1e9, tz=timezone.utc)
+
+
+def bump_feeds(*scopes):
+    """Делает закешированные страницы перечисленных лент устаревшими."""
+    now = time.time_ns()
+    cache.set_many({_version_key(scope): now for scope in scopes}, None)
+
+
+def _viewer(request):
+    """
+    В шапке и кнопке подписки есть разметка вошедшего пользователя,
+    поэтому у каждого пользователя свой вариант страницы, а у
+    анонимных — общий.
+    """
+    user = request.user
+    return f"user{user.pk}" if user.is_authenticated else "anon"
+
+
+def page_key_prefix(request, scopes):
+    """Префикс ключа страницы: зритель и версия её лент."""
+    return f"feed_page:{_viewer(request)}:{feed_version(scopes)}"
+
+
+def _cached_response(request, key_prefix):
+    key = get_cache_key(request, key_prefix, "GET", cache=cache)
+    if key is None:
+        return None
+    return cache.get(key)
+
+
+def cache_feed(scopes, timeout=FEED_CACHE_TIMEOUT):
+    """
+    Кеширует страницу ленты под ключом с версией её лент.
+
+    scopes получает аргументы view и возвращает список лент страницы.
+    Пока один процесс перегенерирует устаревшую страницу, остальные
+    отдают её предыдущую версию, а не идут в базу одновременно.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return view(request, *args, **kwargs)
+            key_prefix = page_key_prefix(request, scopes(**kwargs))
+            response = _cached_response(request, key_prefix)
+            if response is not None:
+                return response
+            lock_key = _path_key(request, "lock") + key_prefix
+            latest_key = _path_key(request, "latest_" + _viewer(request))
+            locked = cache.add(lock_key, True, REGENERATE_LOCK_TIMEOUT)
+            if not locked:
+                latest_prefix = cache.get(latest_key)
+                if latest_prefix is not None:
+                    response = _cached_response(request, latest_prefix)
+                    if response is not None:
+                        return response
+            try:
+                cached_view = cache_page(timeout, key_prefix=key_prefix)(view)
+                response = cached_view(request, *args, **kwargs)
+                cache.set(latest_key, key_prefix, timeout)
+                return response
+            finally:
+                # Чужую блокировку не снимаем: её владелец ещё рендерит.
+                if locked:
+                    cache.delete(lock_key)
+
+        return wrapper
+
+    return decorator
+
+
+def conditional_feed(scopes):
+    """
+    Отвечает 304 Not Modified, если ленты страницы не менялись
+    с прошлого запроса клиента.
+
+    Свежесть берётся из версий лент в кеше, поэтому 304 обходится
+    без рендера шаблона и без запросов постов. В ETag входит cookie
+    сессии: страницы вошедшего и анонимного пользователя различаются.
+    scopes получает аргументы view; пустой список отключает проверку.
+    """
+
+    def page_scopes_of(request, kwargs):
+        # etag и last_modified вызываются для одного запроса подряд.
+        if not hasattr(request, "_feed_scopes"):
+            request._feed_scopes = scopes(**kwargs)
+        return request._feed_scopes
+
+    def etag(request, **kwargs):
+        page_scopes = page_scopes_of(request, kwargs)
+        if not page_scopes:
+            return None
+        session = request.COOKIES.get(settings.SESSION_COOKIE_NAME, "")
+        value = f"{feed_version(page_scopes)}:{session}"
+        return hashlib.md5(value.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        page_scopes = page_scopes_of(request, kwargs)
+        if not page_scopes:
+            return None
+        return feed_last_modified(page_scopes)
+
+    def decorator(view):
+        return condition(etag_func=etag, last_modified_func=last_modified)(
+            view
+        )
+
+    return decorator
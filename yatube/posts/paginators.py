@@ -0,0 +1,229 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+CURSOR_NEXT = "n"
+CURSOR_PREVIOUS = "p"
+CURSOR_SEPARATOR = "|"
+ROW_COUNT_TIMEOUT = 60 * 60
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _row_pk(row):
+    """pk модели или словаря из .values(), где он выбран как "pk"."""
+    return row["pk"] if isinstance(row, dict) else row.pk
+
+
+def encode_cursor(post, direction=CURSOR_NEXT):
+    """Упаковывает позицию поста (pub_date, id) в непрозрачный токен."""
+    pub_date = post["pub_date"] if isinstance(post, dict) else post.pub_date
+    value = CURSOR_SEPARATOR.join(
+        (direction, pub_date.isoformat(), str(_row_pk(post)))
+    )
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_cursor(cursor):
+    try:
+        value = force_str(urlsafe_base64_decode(cursor))
+        direction, pub_date, pk = value.split(CURSOR_SEPARATOR)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        raise InvalidCursor(cursor)
+    return direction, pub_date, pk
+
+
+def encode_score_cursor(score, pk):
+    """Курсор для выдачи, упорядоченной по (score, id)."""
+    value = f"{score!r}{CURSOR_SEPARATOR}{pk}"
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_score_cursor(cursor):
+    """Возвращает (score, pk) или None для битого курсора."""
+    try:
+        score, pk = force_str(urlsafe_base64_decode(cursor)).split(
+            CURSOR_SEPARATOR
+        )
+        return float(score), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+
+
+class CursorPage(Page):
+    """Страница, полученная по курсору, а не по номеру."""
+
+    def __init__(self, object_list, paginator, cursor, has_next, has_prev):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self._has_next = has_next
+        self._has_previous = has_prev
+
+    def __repr__(self):
+        return f"<Page after cursor {self.cursor}>"
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+
+class CursorPaginator(Paginator):
+    """
+    Паджинатор по ключу (pub_date, id).
+
+    По умолчанию новые записи идут первыми, ordering=("pub_date", "pk")
+    включает обратный порядок. Номерные страницы работают как
+    у обычного Paginator, а страницы по курсору выбираются через WHERE
+    по ключу без OFFSET и COUNT(*), поэтому их стоимость не зависит
+    от глубины.
+    """
+
+    ordering = ("-pub_date", "-pk")
+    ELLIPSIS = "…"
+
+    def __init__(
+        self, object_list, per_page, count=None, ordering=None, **kwargs
+    ):
+        if ordering is not None:
+            self.ordering = ordering
+        object_list = object_list.order_by(*self.ordering)
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            # Готовое значение из счётчиков вместо SELECT COUNT(*).
+            self.count = count
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """
+        Номера страниц: on_ends с каждого края и on_each_side вокруг
+        текущей, пропуски заменены на ELLIPSIS. Длина списка не зависит
+        от числа страниц.
+        """
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def get_first_page(self):
+        """Первая страница без SELECT COUNT(*)."""
+        rows = list(self.object_list[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        return CursorPage(rows[: self.per_page], self, None, has_more, False)
+
+    def get_cursor_page(self, cursor):
+        try:
+            direction, pub_date, pk = decode_cursor(cursor)
+        except InvalidCursor:
+            return self.get_page(1)
+        descending = self.ordering[0].startswith("-")
+        lookup = "lt" if (direction == CURSOR_NEXT) == descending else "gt"
+        queryset = self.object_list.filter(
+            Q(**{f"pub_date__{lookup}": pub_date})
+            | Q(pub_date=pub_date, **{f"pk__{lookup}": pk})
+        )
+        if direction == CURSOR_PREVIOUS:
+            queryset = queryset.reverse()
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == CURSOR_NEXT:
+            return CursorPage(rows, self, cursor, has_more, True)
+        rows.reverse()
+        return CursorPage(rows, self, cursor, True, has_more)
+
+
+class CachedCountPaginator(CursorPaginator):
+    """
+    Паджинатор, который берёт число записей из кеша по count_key.
+
+    Ключ сбрасывают записи, меняющие ленту. Если estimate() оценивает
+    таблицу больше чем в ROW_COUNT_ESTIMATE_THRESHOLD строк, точный
+    COUNT(*) не выполняется: число помечается как примерное
+    (approximate), и шаблон выводит «около N страниц».
+    """
+
+    approximate = False
+
+    def __init__(
+        self, object_list, per_page, count_key=None, estimate=None, **kwargs
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        counted = cache.get(self.count_key) if self.count_key else None
+        if counted is None:
+            counted = self.count_rows()
+            if self.count_key:
+                cache.set(self.count_key, counted, ROW_COUNT_TIMEOUT)
+        count, self.approximate = counted
+        return count
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """
+        При примерном числе записей последние страницы могут
+        оказаться пустыми, поэтому после пропуска они не выводятся.
+        """
+        number = self.validate_number(number)
+        pages = list(
+            super().get_elided_page_range(number, on_each_side, on_ends)
+        )
+        if self.approximate:
+            current = pages.index(number)
+            tail = pages[current:]
+            if self.ELLIPSIS in tail:
+                pages = pages[: current + tail.index(self.ELLIPSIS) + 1]
+        return pages
+
+    def count_rows(self):
+        """Возвращает (число записей, примерное ли оно)."""
+        estimate = self.estimate() if self.estimate else None
+        threshold = getattr(settings, "ROW_COUNT_ESTIMATE_THRESHOLD", None)
+        if estimate is not None and threshold and estimate > threshold:
+            return estimate, True
+        return self.object_list.count(), False
+
+
+def get_id_page(queryset, after, per_page):
+    """
+    Страница по убыванию id после записи с id after.
+
+    Возвращает записи страницы и id для следующей страницы
+    (None, если её нет). Битое значение after — первая страница.
+    """
+    queryset = queryset.order_by("-pk")
+    try:
+        queryset = queryset.filter(pk__lt=int(after))
+    except (TypeError, ValueError):
+        pass
+    rows = list(queryset[: per_page + 1])
+    if len(rows) > per_page:
+        return rows[:per_page], _row_pk(rows[per_page - 1])
+    return rows, None
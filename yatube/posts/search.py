@@ -0,0 +1,184 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .paginators import decode_score_cursor, encode_score_cursor
+
+
+DEFAULT_SEARCH_BACKEND = "posts.search.SQLiteFTSBackend"
+FTS_TABLE = "posts_post_fts"
+FTS_COLUMNS = "rowid, text, group_id, author_id"
+WORD_RE = re.compile(r"\w+")
+
+
+class SearchBackend:
+    """
+    Интерфейс поискового индекса постов.
+
+    search() возвращает id найденных постов в порядке релевантности
+    и курсор следующей страницы (пустая строка, если её нет).
+    """
+
+    def index(self, post):
+        raise NotImplementedError
+
+    def remove(self, post_id):
+        raise NotImplementedError
+
+    def index_many(self, post_ids):
+        """Переиндексирует посты по id одним запросом к базе."""
+        raise NotImplementedError
+
+    def remove_many(self, post_ids):
+        raise NotImplementedError
+
+    def reindex(self):
+        raise NotImplementedError
+
+    def search(self, query, limit, group_id=None, author_id=None, cursor=None):
+        raise NotImplementedError
+
+    def _page(self, rows, limit):
+        """rows — (rank, pk) с одной лишней строкой для проверки next."""
+        next_cursor = ""
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_score_cursor(*rows[-1])
+        return [pk for _, pk in rows], next_cursor
+
+
+class LikeSearchBackend(SearchBackend):
+    """Поиск через LIKE '%...%': без индекса, новые посты первыми."""
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def index_many(self, post_ids):
+        pass
+
+    def remove_many(self, post_ids):
+        pass
+
+    def reindex(self):
+        pass
+
+    def search(self, query, limit, group_id=None, author_id=None, cursor=None):
+        words = WORD_RE.findall(query)
+        if not words:
+            return [], ""
+        posts = Post.objects.order_by("-pk")
+        for word in words:
+            posts = posts.filter(text__icontains=word)
+        if group_id is not None:
+            posts = posts.filter(group_id=group_id)
+        if author_id is not None:
+            posts = posts.filter(author_id=author_id)
+        position = cursor and decode_score_cursor(cursor)
+        if position:
+            posts = posts.filter(pk__lt=position[1])
+        pks = posts.values_list("pk", flat=True)[: limit + 1]
+        return self._page([(0.0, pk) for pk in pks], limit)
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Инвертированный индекс на виртуальной таблице SQLite FTS5."""
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk]
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_COLUMNS}) "
+                "VALUES (%s, %s, %s, %s)",
+                [post.pk, post.text, post.group_id, post.author_id],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id]
+            )
+
+    def index_many(self, post_ids):
+        self.remove_many(post_ids)
+        placeholders = ", ".join(["%s"] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_COLUMNS}) "
+                "SELECT id, text, group_id, author_id "
+                f"FROM {Post._meta.db_table} WHERE id IN ({placeholders})",
+                list(post_ids),
+            )
+
+    def remove_many(self, post_ids):
+        placeholders = ", ".join(["%s"] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+                list(post_ids),
+            )
+
+    def reindex(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_COLUMNS}) "
+                "SELECT id, text, group_id, author_id "
+                f"FROM {Post._meta.db_table}"
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+            )
+
+    def search(self, query, limit, group_id=None, author_id=None, cursor=None):
+        words = WORD_RE.findall(query)
+        if not words:
+            return [], ""
+        # Слова в кавычках, чтобы спецсимволы FTS5 не ломали запрос,
+        # и с поиском по префиксу, как у LIKE по подстроке.
+        match = " ".join(f'"{word}"*' for word in words)
+        sql = [
+            f"SELECT rank, rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        ]
+        params = [match]
+        if group_id is not None:
+            sql.append("AND group_id = %s")
+            params.append(group_id)
+        if author_id is not None:
+            sql.append("AND author_id = %s")
+            params.append(author_id)
+        position = cursor and decode_score_cursor(cursor)
+        if position:
+            sql.append("AND (rank > %s OR (rank = %s AND rowid > %s))")
+            params.extend((position[0], position[0], position[1]))
+        sql.append("ORDER BY rank, rowid LIMIT %s")
+        params.append(limit + 1)
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(" ".join(sql), params)
+            rows = db_cursor.fetchall()
+        return self._page(rows, limit)
+
+
+def get_backend():
+    path = getattr(settings, "POSTS_SEARCH_BACKEND", DEFAULT_SEARCH_BACKEND)
+    return import_string(path)()
+
+
+def search_posts(query, limit, group=None, author=None, cursor=None):
+    """Возвращает найденные посты страницы и курсор следующей страницы."""
+    ids, next_cursor = get_backend().search(
+        query,
+        limit,
+        group_id=group and group.pk,
+        author_id=author and author.pk,
+        cursor=cursor,
+    )
+    posts = Post.objects.select_related("author", "group").in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts], next_cursor
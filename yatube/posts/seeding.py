@@ -0,0 +1,187 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from faker import Faker
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Count, F, Max
+from django.urls import reverse
+from django.utils import timezone
+
+from . import counters, search, timeline, trending
+from .models import Comment, Follow, Group, Post, User
+
+
+SEED_BATCH_SIZE = 5000
+# Тексты генерируются заранее: Faker на каждый из миллионов постов
+# работал бы дольше самой вставки.
+TEXT_POOL_SIZE = 1000
+PUB_DATE_SPREAD = timedelta(days=365)
+GROUPLESS_SHARE = 0.2
+
+
+@contextmanager
+def manual_pub_date(*models):
+    """Отключает auto_now_add, чтобы bulk_create сохранил даты из данных."""
+    fields = [model._meta.get_field("pub_date") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Seeder:
+    """
+    Наполняет базу пользователями, группами, постами, комментариями
+    и подписками пачками через bulk_create.
+
+    Сигналы при bulk_create не срабатывают, поэтому после вставки
+    счётчики, поисковый индекс и ленты подписок пересобираются целиком.
+    """
+
+    def __init__(self, seed=None, batch_size=SEED_BATCH_SIZE, stdout=None):
+        self.random = random.Random(seed)
+        self.faker = Faker("ru_RU")
+        self.faker.seed_instance(seed)
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.now = timezone.now()
+        self.texts = [
+            self.faker.text(max_nb_chars=400) for _ in range(TEXT_POOL_SIZE)
+        ]
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def batches(self, total, make):
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            yield [make(start + i) for i in range(size)]
+
+    def text(self):
+        return self.random.choice(self.texts)
+
+    def pub_date(self):
+        return self.now - PUB_DATE_SPREAD * self.random.random()
+
+    def create(self, model, total, make, **options):
+        """
+        Вставляет total строк и возвращает range их id: в транзакции
+        сида других вставок нет, поэтому id новых строк идут подряд.
+        """
+        last_pk = model.objects.aggregate(last=Max("pk"))["last"] or 0
+        created = 0
+        for batch in self.batches(total, make):
+            # Размер INSERT выбирает бэкенд: у SQLite он ограничен
+            # числом параметров запроса.
+            model.objects.bulk_create(batch, **options)
+            created += len(batch)
+            self.log(f"{model.__name__}: {created}/{total}")
+        new_last_pk = model.objects.aggregate(last=Max("pk"))["last"] or 0
+        return range(last_pk + 1, new_last_pk + 1)
+
+    def seed(self, users=0, groups=0, posts=0, comments=0, follows=0):
+        # Префикс из времени запуска, чтобы повторные запуски
+        # не упирались в уникальность username и slug.
+        prefix = f"seed{self.now:%Y%m%d%H%M%S}_"
+        password = make_password(None)
+        with transaction.atomic():
+            self.create(
+                User,
+                users,
+                lambda i: User(username=f"{prefix}{i}", password=password),
+            )
+            self.create(
+                Group,
+                groups,
+                lambda i: Group(
+                    title=self.faker.catch_phrase()[:200],
+                    slug=f"{prefix}{i}".replace("_", "-"),
+                    description=self.text(),
+                ),
+            )
+            user_ids = list(User.objects.values_list("pk", flat=True))
+            group_ids = list(Group.objects.values_list("pk", flat=True))
+            with manual_pub_date(Post, Comment):
+                post_ids = range(0)
+                if posts and user_ids:
+                    # Комментарии достаются постам этого запуска: id
+                    # выбираются из диапазона, а не списка всех постов.
+                    post_ids = self.create(
+                        Post,
+                        posts,
+                        lambda i: self.make_post(user_ids, group_ids),
+                    )
+                if comments and post_ids:
+                    self.create(
+                        Comment,
+                        comments,
+                        lambda i: Comment(
+                            post_id=self.random.choice(post_ids),
+                            author_id=self.random.choice(user_ids),
+                            text=self.text(),
+                            pub_date=self.pub_date(),
+                        ),
+                    )
+            if follows and len(user_ids) > 1:
+                self.create(
+                    Follow,
+                    follows,
+                    lambda i: Follow(
+                        user_id=self.random.choice(user_ids),
+                        author_id=self.random.choice(user_ids),
+                    ),
+                    ignore_conflicts=True,
+                )
+                Follow.objects.filter(user=F("author")).delete()
+            self.rebuild_derived()
+
+    def make_post(self, user_ids, group_ids):
+        group_id = None
+        if group_ids and self.random.random() > GROUPLESS_SHARE:
+            group_id = self.random.choice(group_ids)
+        return Post(
+            text=self.text(),
+            author_id=self.random.choice(user_ids),
+            group_id=group_id,
+            pub_date=self.pub_date(),
+        )
+
+    def rebuild_derived(self):
+        self.log("Пересчёт счётчиков, поискового индекса, лент и рейтинга")
+        counters.recount()
+        search.get_backend().reindex()
+        timeline.rebuild_timelines()
+        trending.compute_trending()
+        # Статистика для планировщика и оценки числа строк лент.
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+
+def sample_pages():
+    """
+    Адреса самых тяжёлых страниц текущей базы для замеров
+    и читатель с наибольшим числом подписок для ленты follow.
+    """
+    group = Group.objects.order_by("-posts_count").first()
+    author = User.objects.order_by("-stats__posts_count").first()
+    post = Post.objects.order_by("-comments_count").first()
+    follower = (
+        User.objects.annotate(following_total=Count("follower"))
+        .order_by("-following_total")
+        .first()
+    )
+    pages = {"index": reverse("posts:index")}
+    if group:
+        pages["group_posts"] = reverse("posts:group_list", args=[group.slug])
+    if author:
+        pages["profile"] = reverse("posts:profile", args=[author.username])
+    if post:
+        pages["post_detail"] = reverse("posts:post_detail", args=[post.pk])
+    return pages, follower
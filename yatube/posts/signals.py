@@ -0,0 +1,284 @@
+import threading
+
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    counters,
+    follow_graph,
+    fragments,
+    page_cache,
+    search,
+    thumbnails,
+    timeline,
+)
+from .models import (
+    AuthorStats,
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TimelineEntry,
+    User,
+)
+
+
+AUTHOR_NAME_FIELDS = ("username", "first_name", "last_name")
+# id постов, которые сейчас удаляются вместе с комментариями.
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, "post_ids"):
+        _deleting.post_ids = set()
+    return _deleting.post_ids
+
+
+@receiver(pre_delete, sender=Post)
+def post_mark_deleting(sender, instance, **kwargs):
+    """
+    Комментарии удаляемого поста удаляются вместе с ним: счётчик
+    и ленты поста поправит удаление самого поста, а не каждый
+    комментарий по отдельности.
+    """
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_unmark_deleting(sender, instance, **kwargs):
+    deleting_posts().discard(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_saved_to_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+    else:
+        TimelineEntry.objects.filter(post=instance).update(
+            pub_date=instance.pub_date
+        )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved_to_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.add_author_to_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted_from_timeline(sender, instance, **kwargs):
+    timeline.remove_author_from_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved_to_celebrities(sender, instance, created, **kwargs):
+    if created:
+        timeline.followers_changed(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_from_cards(sender, instance, **kwargs):
+    fragments.invalidate_post_card(instance)
+
+
+@receiver(pre_save, sender=User)
+def author_remember_name(sender, instance, update_fields, **kwargs):
+    """
+    Запоминаем прежнее имя: карточки сбрасываются, только если
+    оно изменилось, а не при любом сохранении вроде смены пароля.
+    """
+    instance._previous_name = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(AUTHOR_NAME_FIELDS) & set(
+        update_fields
+    ):
+        return
+    instance._previous_name = (
+        User.objects.filter(pk=instance.pk)
+        .values_list(*AUTHOR_NAME_FIELDS)
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def author_renamed(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+        return
+    previous = getattr(instance, "_previous_name", None)
+    name = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if previous is None or previous == name:
+        return
+    fragments.invalidate_author_cards(instance)
+    group_slugs = Group.objects.filter(posts__author=instance).values_list(
+        "slug", flat=True
+    )
+    page_cache.bump_feeds(
+        page_cache.INDEX_SCOPE,
+        page_cache.author_scope(previous[0]),
+        page_cache.author_scope(instance.username),
+        *(page_cache.group_scope(slug) for slug in group_slugs.distinct()),
+    )
+
+
+def post_feed_scopes(post):
+    scopes = [
+        page_cache.INDEX_SCOPE,
+        page_cache.TRENDING_SCOPE,
+        page_cache.author_scope(post.author.username),
+    ]
+    if post.group_id:
+        scopes.append(page_cache.group_scope(post.group.slug))
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, **kwargs):
+    """Запоминаем старую группу: при её смене меняются обе ленты."""
+    instance._previous_group = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list("group_id", "group__slug")
+        .first()
+    )
+
+
+def previous_group(post):
+    """Возвращает (id, slug) прежней группы, если пост сменил группу."""
+    previous = getattr(post, "_previous_group", None)
+    if previous is None or previous[0] == post.group_id:
+        return None
+    return previous
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_bump_feeds(sender, instance, **kwargs):
+    scopes = post_feed_scopes(instance)
+    previous = previous_group(instance)
+    if previous and previous[0]:
+        scopes.append(page_cache.group_scope(previous[1]))
+    page_cache.bump_feeds(*scopes)
+
+
+@receiver(post_save, sender=Post)
+def post_saved_to_counters(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_stats(instance.author_id, "posts_count", 1)
+        if instance.group_id:
+            counters.change_group_posts(instance.group_id, 1)
+        return
+    previous = previous_group(instance)
+    if previous is None:
+        return
+    if previous[0]:
+        counters.change_group_posts(previous[0], -1)
+    if instance.group_id:
+        counters.change_group_posts(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_from_counters(sender, instance, **kwargs):
+    counters.change_author_stats(instance.author_id, "posts_count", -1)
+    if instance.group_id:
+        counters.change_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved_to_counters(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted_from_counters(sender, instance, **kwargs):
+    if instance.post_id not in deleting_posts():
+        counters.change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved_to_counters(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_stats(instance.author_id, "followers_count", 1)
+        counters.change_author_stats(instance.user_id, "following_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted_from_counters(sender, instance, **kwargs):
+    counters.change_author_stats(instance.author_id, "followers_count", -1)
+    counters.change_author_stats(instance.user_id, "following_count", -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_bump_feeds(sender, instance, **kwargs):
+    if instance.post_id in deleting_posts():
+        return
+    # Пост не загружается: хватает имени автора и slug группы.
+    row = (
+        Post.objects.filter(pk=instance.post_id)
+        .values_list("author__username", "group__slug")
+        .first()
+    )
+    if row is None:
+        return
+    username, slug = row
+    scopes = [page_cache.INDEX_SCOPE, page_cache.author_scope(username)]
+    if slug:
+        scopes.append(page_cache.group_scope(slug))
+    page_cache.bump_feeds(*scopes)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_bump_feeds(sender, instance, **kwargs):
+    page_cache.bump_feeds(
+        page_cache.INDEX_SCOPE, page_cache.group_scope(instance.slug)
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_bump_feeds(sender, instance, **kwargs):
+    page_cache.bump_feeds(page_cache.author_scope(instance.author.username))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_invalidate_graph(sender, instance, **kwargs):
+    follow_graph.invalidate_following(instance.user_id)
+    counters.invalidate_row_counts(
+        counters.timeline_count_key(instance.user_id)
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_invalidate_row_counts(sender, instance, **kwargs):
+    if kwargs.get("created", True):
+        counters.invalidate_row_counts(counters.INDEX_COUNT_KEY)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_from_timeline_counts(sender, instance, **kwargs):
+    timeline.invalidate_follower_counts([instance.author_id])
+
+
+@receiver(post_save, sender=Post)
+def post_saved_to_search(sender, instance, **kwargs):
+    search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_from_search(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_saved_to_thumbnails(sender, instance, **kwargs):
+    thumbnails.schedule_thumbnail(instance)
@@ -0,0 +1,12 @@
+from django import template
+
+from posts.follow_graph import is_following
+
+
+register = template.Library()
+
+
+@register.filter
+def followed_by(author, user):
+    """{% if author|followed_by:request.user %} без запроса на автора."""
+    return is_following(user, author)
@@ -0,0 +1,40 @@
+from django import template
+
+from posts.paginators import CURSOR_NEXT, CURSOR_PREVIOUS, encode_cursor
+
+
+register = template.Library()
+
+
+@register.filter
+def next_cursor(page):
+    if not page.has_next() or not len(page):
+        return ""
+    return encode_cursor(page[len(page) - 1], CURSOR_NEXT)
+
+
+@register.filter
+def previous_cursor(page):
+    if not page.has_previous() or not len(page):
+        return ""
+    return encode_cursor(page[0], CURSOR_PREVIOUS)
+
+
+@register.inclusion_tag("posts/includes/page_links.html")
+def page_links(page, on_each_side=None):
+    """
+    Ссылки на номера страниц окном вокруг текущей. По умолчанию
+    берётся окно, которое посчитал paginate_posts.
+    """
+    window = getattr(page, "page_window", None)
+    if on_each_side is not None:
+        window = page.paginator.get_elided_page_range(
+            page.number, on_each_side=on_each_side
+        )
+    elif window is None:
+        window = page.paginator.get_elided_page_range(page.number)
+    return {
+        "page": page,
+        "window": window,
+        "ellipsis": page.paginator.ELLIPSIS,
+    }
@@ -0,0 +1,16 @@
+from django import template
+
+from posts.fragments import get_post_cards
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    return get_post_cards(posts)
+
+
+@register.filter
+def card(cards, post):
+    return cards[post.pk]
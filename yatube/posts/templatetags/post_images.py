@@ -0,0 +1,56 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from posts.thumbnails import FALLBACK_FORMAT, renditions
+
+
+register = template.Library()
+
+DEFAULT_SIZES = "(max-width: 992px) 100vw, 960px"
+# Пока фоновая генерация версий не закончилась, показываем оригинал.
+FALLBACK_SCRIPT = (
+    "this.onerror=null;"
+    "this.parentNode.querySelectorAll('source')"
+    ".forEach(function(s){{s.remove()}});"
+    "this.removeAttribute('srcset');this.src='{}'"
+)
+
+
+@register.simple_tag
+def responsive_image(post, css_class="card-img my-2", sizes=DEFAULT_SIZES):
+    if not post.image:
+        return ""
+    if not post.thumbnail:
+        # Миниатюры ещё не созданы, например для постов, загруженных
+        # до их появления: показываем оригинал.
+        return format_html(
+            '<img class="{}" src="{}" alt>', css_class, post.image.url
+        )
+    storage = post.image.storage
+    srcsets = {
+        image_format: ", ".join(
+            f"{storage.url(name)} {width}w" for width, name in items
+        )
+        for image_format, items in renditions(post.image.name).items()
+    }
+    sources = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (image_format, srcset, sizes)
+            for image_format, srcset in srcsets.items()
+            if image_format != FALLBACK_FORMAT
+        ),
+    )
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" onerror="{}" alt></picture>',
+        sources,
+        css_class,
+        post.thumbnail_url,
+        srcsets[FALLBACK_FORMAT],
+        sizes,
+        post.thumbnail_width,
+        post.thumbnail_height,
+        FALLBACK_SCRIPT.format(post.image.url),
+    )
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class TestPostsAdmin(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="Moderator", email="moderator@example.com", password="x"
+        )
+        cls.author = User.objects.create_user(username="AdminAuthor")
+        cls.group = Group.objects.create(
+            title="Группа админки", slug="admin-group", description="Описание"
+        )
+        for number in range(5):
+            user = User.objects.create_user(username=f"AdminReader{number}")
+            Follow.objects.create(user=user, author=cls.author)
+        cls.post = Post.objects.create(
+            text="Пост для админки", author=cls.author, group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.admin, text="Ок")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, params=None):
+        url = reverse(f"admin:posts_{model}_changelist")
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_posts_admin_changelist_queries_do_not_grow(self):
+        """
+        Проверяем, что число запросов списка не зависит от числа строк:
+        связанные объекты приходят одним JOIN.
+        """
+        for model in ("post", "comment", "follow"):
+            with self.subTest(model=model):
+                queries = len(self.changelist(model).query_stats.queries)
+                Post.objects.create(text="Ещё", author=self.admin)
+                Comment.objects.create(
+                    post=self.post, author=self.author, text="Ещё"
+                )
+                Follow.objects.create(
+                    user=User.objects.create_user(username=f"New{model}"),
+                    author=self.admin,
+                )
+                response = self.changelist(model)
+                self.assertEqual(len(response.query_stats.queries), queries)
+
+    def test_posts_admin_user_filter_is_input(self):
+        """Проверяем, что фильтр подписок не перечисляет пользователей."""
+        response = self.changelist("follow")
+        self.assertNotContains(response, "user__id__exact")
+        response = self.changelist("follow", {"user": "AdminReader3"})
+        self.assertEqual(response.context["cl"].result_count, 1)
+        self.assertContains(response, 'value="AdminReader3"')
+
+    def test_posts_admin_counts_estimated_for_large_tables(self):
+        with override_settings(ROW_COUNT_ESTIMATE_THRESHOLD=10):
+            with mock.patch.object(
+                counters, "estimate_rows", return_value=5000
+            ):
+                response = self.changelist("comment")
+        self.assertEqual(response.context["cl"].result_count, 5000)
+
+    def test_posts_admin_search_uses_index(self):
+        response = self.changelist("post", {"q": "админки"})
+        self.assertEqual(
+            list(response.context["cl"].result_list), [self.post]
+        )
@@ -0,0 +1,167 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import bulk, counters, page_cache, search
+from posts.models import (
+    AuthorStats,
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TimelineEntry,
+)
+
+
+User = get_user_model()
+
+
+class TestPostsBulkActions(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="BulkModerator", email="bulk@example.com", password="x"
+        )
+        cls.spammer = User.objects.create_user(username="Spammer")
+        cls.author = User.objects.create_user(username="BulkAuthor")
+        cls.reader = User.objects.create_user(username="BulkReader")
+        cls.old_group = Group.objects.create(
+            title="Старая группа", slug="old-group", description="Описание"
+        )
+        cls.new_group = Group.objects.create(
+            title="Новая группа", slug="new-group", description="Описание"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.spammer)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.spam = [
+            Post.objects.create(
+                text=f"Спам {number}",
+                author=self.spammer,
+                group=self.old_group,
+            )
+            for number in range(5)
+        ]
+        self.post = Post.objects.create(
+            text="Обычный пост", author=self.author, group=self.old_group
+        )
+        for post in self.spam[:2] + [self.post]:
+            Comment.objects.create(post=post, author=self.spammer, text="!")
+            Comment.objects.create(post=post, author=self.author, text="Ок")
+
+    def action(self, model, action, objects, **data):
+        return self.client.post(
+            reverse(f"admin:posts_{model}_changelist"),
+            {
+                "action": action,
+                "_selected_action": [obj.pk for obj in objects],
+                **data,
+            },
+        )
+
+    def assertCountersMatch(self):
+        stats = dict(AuthorStats.objects.values_list("user_id", "posts_count"))
+        groups = dict(Group.objects.values_list("pk", "posts_count"))
+        comments = dict(Post.objects.values_list("pk", "comments_count"))
+        counters.recount()
+        self.assertEqual(
+            stats,
+            dict(AuthorStats.objects.values_list("user_id", "posts_count")),
+        )
+        self.assertEqual(
+            groups, dict(Group.objects.values_list("pk", "posts_count"))
+        )
+        self.assertEqual(
+            comments, dict(Post.objects.values_list("pk", "comments_count"))
+        )
+
+    def test_posts_bulk_move_to_group(self):
+        """
+        Проверяем, что перенос в группу идёт пачками UPDATE,
+        поправляет счётчики, поиск и сбрасывает кеш лент.
+        """
+        version = page_cache.feed_version(
+            [page_cache.group_scope("new-group")]
+        )
+        progress = []
+        with mock.patch.object(bulk, "BULK_BATCH_SIZE", 2), mock.patch.object(
+            bulk,
+            "log_progress",
+            side_effect=lambda *args: progress.append(args),
+        ):
+            response = self.action(
+                "post",
+                "move_to_group",
+                self.spam,
+                target_group=self.new_group.pk,
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(self.new_group.posts.count(), 5)
+        self.assertCountersMatch()
+        self.assertNotEqual(
+            page_cache.feed_version([page_cache.group_scope("new-group")]),
+            version,
+        )
+        posts, _ = search.search_posts("Спам", 10, group=self.new_group)
+        self.assertEqual(len(posts), 5)
+
+    def test_posts_bulk_move_requires_group(self):
+        self.action("post", "move_to_group", self.spam)
+        self.assertEqual(self.old_group.posts.count(), 6)
+
+    def test_posts_bulk_merge_groups(self):
+        response = self.action(
+            "group",
+            "merge_groups",
+            [self.old_group, self.new_group],
+            target_group=self.new_group.pk,
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Group.objects.filter(slug="old-group").exists())
+        self.assertEqual(self.new_group.posts.count(), 6)
+        self.assertCountersMatch()
+
+    def test_posts_bulk_delete_comments_by_author(self):
+        """Проверяем подтверждение и удаление комментариев автора."""
+        comment = Comment.objects.filter(author=self.spammer).first()
+        response = self.action("comment", "delete_author_comments", [comment])
+        self.assertContains(response, "Spammer")
+        self.assertEqual(
+            Comment.objects.filter(author=self.spammer).count(), 3
+        )
+        response = self.action(
+            "comment", "delete_author_comments", [comment], post="yes"
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Comment.objects.filter(author=self.spammer).exists())
+        self.assertEqual(Comment.objects.count(), 3)
+        self.assertCountersMatch()
+
+    def test_posts_bulk_delete_posts_by_author(self):
+        """
+        Проверяем, что посты автора удаляются вместе с зависимыми
+        строками без загрузки объектов и сигналов.
+        """
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        with mock.patch.object(
+            search.SQLiteFTSBackend, "remove"
+        ) as remove_one:
+            response = self.action(
+                "post", "delete_author_posts", self.spam[:1], post="yes"
+            )
+        self.assertEqual(response.status_code, 302)
+        remove_one.assert_not_called()
+        self.assertEqual(list(Post.objects.all()), [self.post])
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(search.search_posts("Спам", 10)[0], [])
+        self.assertCountersMatch()
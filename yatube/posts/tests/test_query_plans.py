@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from posts import timeline
+from posts.management.commands.explain_queries import plan_problems
+from posts.models import Follow
+from posts.seeding import Seeder
+
+
+class TestPostsQueryPlans(TestCase):
+    def test_posts_feed_queries_use_indexes(self):
+        """
+        Проверяем, что запросы основных страниц не проходят
+        таблицы целиком и не сортируют ленты без индекса.
+        """
+        Seeder(seed=1).seed(
+            users=20, groups=3, posts=300, comments=300, follows=60
+        )
+        output = StringIO()
+        call_command("explain_queries", stdout=output)
+        self.assertIn("Все запросы используют индексы", output.getvalue())
+
+    def test_posts_home_timeline_reads_celebrities_by_author(self):
+        """
+        Проверяем, что посты популярных авторов читаются в ленту
+        подписок по индексу автора, а не проходом всех постов по дате.
+        """
+        Seeder(seed=1).seed(
+            users=20, groups=3, posts=300, comments=0, follows=60
+        )
+        follow = Follow.objects.first()
+        timeline.mark_celebrity(follow.author_id)
+        sql, params = (
+            timeline.home_timeline(follow.user)
+            .order_by("-pub_date", "-id")[:10]
+            .query.sql_with_params()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            details = [detail for *_, detail in cursor.fetchall()]
+        self.assertIn(
+            "SEARCH U0 USING COVERING INDEX post_author_date_idx "
+            "(author_id=?)",
+            details,
+        )
+        self.assertFalse(
+            [detail for detail in details if "INDEX post_date_idx" in detail]
+        )
+
+    def test_posts_plan_problems_detected(self):
+        """Проверяем, что полный проход и сортировка попадают в отчёт."""
+        plan = [
+            (2, 0, 0, "SCAN posts_post"),
+            (5, 0, 0, "SCAN posts_post USING INDEX post_date_idx"),
+            (9, 0, 0, "USE TEMP B-TREE FOR ORDER BY"),
+        ]
+        self.assertEqual(
+            plan_problems(plan),
+            ["полный проход по posts_post", "USE TEMP B-TREE FOR ORDER BY"],
+        )
+        self.assertEqual(
+            plan_problems(plan, allow_sort=True),
+            ["полный проход по posts_post"],
+        )
@@ -0,0 +1,64 @@
+import json
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, Follow, Post, TimelineEntry
+from posts.seeding import Seeder
+
+
+class TestPostsSeeding(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_seeder_builds_derived_data(self):
+        """
+        Проверяем, что генератор создаёт данные пачками
+        и пересобирает счётчики и ленты подписок.
+        """
+        Seeder(seed=1, batch_size=7).seed(
+            users=5, groups=2, posts=30, comments=20, follows=10
+        )
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertFalse(Follow.objects.filter(user=F("author")).exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list("posts_count", flat=True)),
+            30,
+        )
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            Post.objects.filter(author__following__isnull=False).count(),
+        )
+        self.assertEqual(
+            len(set(Post.objects.values_list("pub_date", flat=True))), 30
+        )
+
+    def test_posts_seeder_comments_new_posts(self):
+        """
+        Проверяем, что повторный запуск комментирует посты этого
+        запуска, выбирая id из их диапазона.
+        """
+        Seeder(seed=1).seed(users=3, posts=10)
+        last_pk = Post.objects.order_by("-pk").values_list("pk")[0][0]
+        Seeder(seed=2).seed(posts=10, comments=30)
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertFalse(Comment.objects.filter(post_id__lte=last_pk))
+        self.assertEqual(Comment.objects.count(), 30)
+
+    def test_posts_benchmark_views_reports_json(self):
+        """Проверяем, что замер выдаёт JSON с перцентилями и запросами."""
+        output = StringIO()
+        call_command(
+            "benchmark_views", sizes=[20], requests=2, seed=1, stdout=output
+        )
+        report = json.loads(output.getvalue())
+        views = report["results"][0]["views"]
+        self.assertEqual(report["results"][0]["posts"], 20)
+        for name in ("index", "group_posts", "profile", "post_detail"):
+            with self.subTest(name=name):
+                self.assertIn("p99_ms", views[name])
+                self.assertGreater(views[name]["queries"], 0)
@@ -1,15 +1,42 @@
+import re
 import shutil
 import tempfile
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
+from unittest import mock
+
+from PIL import Image
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone as dj_timezone
 
+from core.testing import QueryBudgetMixin
+from posts import (
+    bulk,
+    counters,
+    follow_graph,
+    fragments,
+    page_cache,
+    search,
+    thumbnails,
+    timeline,
+    trending,
+    urls as posts_urls,
+    views,
+)
 from posts.forms import PostForm
+from posts.models import AuthorStats, TimelineEntry, TrendingPost
+from posts.paginators import CursorPaginator
+from posts.seeding import manual_pub_date
+from posts.templatetags.paginator_tags import next_cursor, previous_cursor
 from posts.views import Comment, Follow, Group, Post
 
 
@@ -63,6 +90,103 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(response.context["page_obj"]), 5)
 
 
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Kolya")
+        cls.follower = User.objects.create_user(username="Kolya_follower")
+        cls.group = Group.objects.create(
+            title="Тестовая группа курсора",
+            slug="test-group-cursor",
+            description="Группа для теста курсорного паджинатора",
+        )
+        cls.auth_client = Client()
+        cls.auth_client.force_login(cls.follower)
+        Post.objects.bulk_create(
+            Post(text=f"Курсорный пост {i}", author=cls.user, group=cls.group)
+            for i in range(15)
+        )
+        counters.recount()
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.pages = {
+            "posts:index": {},
+            "posts:group_list": {"slug": cls.group.slug},
+            "posts:profile": {"username": cls.user.username},
+            "posts:follow_index": {},
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_cursor_pages_walk_the_feed(self):
+        """
+        Проверяем, что по курсорам можно пройти ленту
+        вперёд и назад без пропусков и повторов.
+        """
+        for page, args in self.pages.items():
+            with self.subTest(page=page):
+                url = reverse(page, kwargs=args)
+                first_page = self.auth_client.get(url).context["page_obj"]
+                cursor = next_cursor(first_page)
+                response = self.auth_client.get(url, {"cursor": cursor})
+                second_page = response.context["page_obj"]
+                self.assertEqual(len(second_page), 5)
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    set(first_page) & set(second_page),
+                    set(),
+                    "Посты повторяются на соседних страницах",
+                )
+                cursor = previous_cursor(second_page)
+                response = self.auth_client.get(url, {"cursor": cursor})
+                self.assertEqual(
+                    list(response.context["page_obj"]),
+                    list(first_page),
+                    "Курсор назад не возвращает на первую страницу",
+                )
+                self.assertFalse(response.context["page_obj"].has_previous())
+
+    def test_posts_cursor_invalid_token_shows_first_page(self):
+        """Проверяем, что битый курсор открывает первую страницу."""
+        response = self.auth_client.get(
+            reverse("posts:index"), {"cursor": "not-a-cursor"}
+        )
+        self.assertEqual(response.context["page_obj"].number, 1)
+
+    def test_posts_elided_page_range(self):
+        """
+        Проверяем, что номера страниц выводятся окном вокруг текущей
+        и их число не зависит от числа страниц.
+        """
+        paginator = CursorPaginator(Post.objects.all(), 1, count=200_000)
+        ellipsis = paginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, 4, ellipsis, 199_999, 200_000],
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1000, on_each_side=1)),
+            [1, 2, ellipsis, 999, 1000, 1001, ellipsis, 199_999, 200_000],
+        )
+        small = CursorPaginator(Post.objects.all(), 5, count=15)
+        self.assertEqual(list(small.get_elided_page_range(2)), [1, 2, 3])
+
+    def test_posts_paginator_renders_window(self):
+        """Проверяем, что лента выводит окно страниц с пропусками."""
+        with mock.patch.object(views, "POSTS_PER_PAGE", 1):
+            response = self.auth_client.get(
+                reverse("posts:index"), {"page": 8}
+            )
+        ellipsis = CursorPaginator.ELLIPSIS
+        self.assertEqual(
+            response.context["page_obj"].page_window,
+            [1, 2, ellipsis, 5, 6, 7, 8, 9, 10, 11, ellipsis, 14, 15],
+        )
+        self.assertContains(response, ellipsis, count=2)
+        self.assertNotContains(response, "?page=12")
+
+
 class TestPostsView(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -311,6 +435,76 @@ class TestPostsCommnets(TestCase):
         )
 
 
+class TestPostsCommentsPagination(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Commentator")
+        cls.post = Post.objects.create(
+            text="Обсуждаемый пост", author=cls.user
+        )
+        start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=cls.user,
+                text=f"Комментарий {number}",
+                pub_date=start + timedelta(minutes=number),
+            )
+            for number in range(views.COMMENTS_PER_PAGE * 2 + 5)
+        )
+        counters.recount()
+        cls.total = Comment.objects.count()
+
+    def setUp(self):
+        self.url = reverse("posts:post_detail", args=[self.post.pk])
+        self.more_url = reverse("posts:post_comments", args=[self.post.pk])
+
+    def load_all(self, order):
+        response = self.client.get(self.url, {"order": order})
+        texts = [comment.text for comment in response.context["comments"]]
+        cursor = next_cursor(response.context["comments"])
+        while cursor:
+            data = self.client.get(
+                self.more_url, {"order": order, "cursor": cursor}
+            ).json()
+            texts.extend(re.findall(r"Комментарий \d+", data["html"]))
+            cursor = data["next_cursor"]
+        return texts
+
+    def test_posts_comments_first_page_limited(self):
+        """
+        Проверяем, что на странице поста выводится только
+        первая порция комментариев, новые первыми.
+        """
+        response = self.client.get(self.url)
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), views.COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, f"Комментарий {self.total - 1}")
+        self.assertContains(response, "Показать ещё")
+
+    def test_posts_comments_load_more_covers_thread(self):
+        """
+        Проверяем, что подгрузка по курсору проходит всё обсуждение
+        без пропусков и повторов в обоих порядках.
+        """
+        expected = [f"Комментарий {number}" for number in range(self.total)]
+        self.assertEqual(self.load_all("oldest"), expected)
+        self.assertEqual(self.load_all("newest"), expected[::-1])
+
+    def test_posts_comments_ignore_drifted_counter(self):
+        """
+        Проверяем, что заниженный счётчик комментариев не прячет
+        ни сами комментарии, ни кнопку «Показать ещё».
+        """
+        Post.objects.filter(pk=self.post.pk).update(comments_count=0)
+        response = self.client.get(self.url)
+        self.assertEqual(
+            len(response.context["comments"]), views.COMMENTS_PER_PAGE
+        )
+        self.assertContains(response, "Показать ещё")
+
+
 class TestPostsIndexCache(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -320,10 +514,13 @@ class TestPostsIndexCache(TestCase):
         cls.auth_client.force_login(cls.user)
         cls.post = Post.objects.create(text="Тест кеша", author=cls.user)
 
+    def setUp(self):
+        cache.clear()
+
     def test_posts_cache_working(self):
         """Проверяем работу кеша на главной странице."""
         response_one = self.auth_client.get(reverse("posts:index"))
-        self.post.delete()
+        Post.objects.bulk_create([Post(text="Без сигналов", author=self.user)])
         response_two = self.auth_client.get(reverse("posts:index"))
         self.assertEqual(
             response_one.content,
@@ -338,6 +535,87 @@ class TestPostsIndexCache(TestCase):
             "Кеш отчищен, но контент не изменился.",
         )
 
+    def test_posts_cache_invalidated_on_write(self):
+        """
+        Проверяем, что запись поста сразу обновляет
+        закешированные главную страницу, группу и профиль.
+        """
+        group = Group.objects.create(
+            title="Группа кеша", slug="cache-group", description="-"
+        )
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": group.slug}),
+            reverse("posts:profile", kwargs={"username": self.user.username}),
+        ]
+        for url in urls:
+            self.auth_client.get(url)
+        Post.objects.create(text="Свежий пост", author=self.user, group=group)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.auth_client.get(url)
+                self.assertContains(response, "Свежий пост")
+
+    def test_posts_cache_serves_stale_page_while_regenerating(self):
+        """
+        Проверяем, что пока страница перегенерируется другим процессом,
+        отдаётся её предыдущая версия.
+        """
+        response_one = self.auth_client.get(reverse("posts:index"))
+        page_cache.bump_feeds(page_cache.INDEX_SCOPE)
+        request = RequestFactory().get(reverse("posts:index"))
+        request.user = self.user
+        key_prefix = page_cache.page_key_prefix(
+            request, [page_cache.INDEX_SCOPE]
+        )
+        lock_key = page_cache._path_key(request, "lock") + key_prefix
+        cache.add(lock_key, True)
+        Post.objects.bulk_create([Post(text="Без сигналов", author=self.user)])
+        response_two = self.auth_client.get(reverse("posts:index"))
+        self.assertEqual(response_one.content, response_two.content)
+
+    def test_posts_cache_keeps_foreign_lock(self):
+        """
+        Проверяем, что процесс без старой страницы рендерит её сам,
+        но не снимает блокировку, взятую другим процессом.
+        """
+        request = RequestFactory().get(reverse("posts:index"))
+        request.user = self.user
+        key_prefix = page_cache.page_key_prefix(
+            request, [page_cache.INDEX_SCOPE]
+        )
+        lock_key = page_cache._path_key(request, "lock") + key_prefix
+        cache.add(lock_key, True)
+        response = self.auth_client.get(reverse("posts:index"))
+        self.assertContains(response, self.post.text)
+        self.assertTrue(cache.get(lock_key))
+
+    def test_posts_cache_separates_viewers(self):
+        """
+        Проверяем, что аноним после вошедшего пользователя не получает
+        закешированную страницу с его именем и кнопкой отписки.
+        """
+        author = User.objects.create_user(username="cache_author")
+        group = Group.objects.create(
+            title="Группа зрителей", slug="viewers", description="-"
+        )
+        Post.objects.create(text="Пост автора", author=author, group=group)
+        Follow.objects.create(user=self.user, author=author)
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": group.slug}),
+            reverse("posts:profile", kwargs={"username": author.username}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.auth_client.get(url)
+                self.assertContains(response, "Пользователь: Ira")
+                response = self.client.get(url)
+                self.assertNotContains(response, "Пользователь: Ira")
+                self.assertNotContains(response, "Отписаться")
+        response = self.auth_client.get(urls[-1])
+        self.assertContains(response, "Отписаться")
+
 
 class TestPostsFollows(TestCase):
     def setUp(self):
@@ -414,3 +692,867 @@ class TestPostsFollows(TestCase):
             response_by_follower,
             "С появлением избранных постов что-то не так.",
         )
+
+
+class TestPostsTimeline(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="timeline_author")
+        self.reader = User.objects.create_user(username="timeline_reader")
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.old_post = Post.objects.create(
+            text="Пост до подписки", author=self.author
+        )
+
+    def follow(self):
+        self.reader_client.get(
+            reverse(
+                "posts:profile_follow",
+                kwargs={"username": self.author.username},
+            )
+        )
+
+    def test_posts_timeline_filled_on_follow_and_create(self):
+        """
+        Проверяем, что подписка добавляет в ленту старые посты автора,
+        а новые посты раскладываются по лентам подписчиков.
+        """
+        self.follow()
+        self.author_client.post(
+            reverse("posts:post_create"), data={"text": "Пост в ленту"}
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        response = self.reader_client.get(reverse("posts:follow_index"))
+        self.assertEqual(
+            [post.text for post in response.context["page_obj"]],
+            ["Пост в ленту", "Пост до подписки"],
+        )
+
+    def test_posts_timeline_cleared_on_unfollow(self):
+        """Проверяем, что отписка убирает посты автора из ленты."""
+        self.follow()
+        self.reader_client.get(
+            reverse(
+                "posts:profile_unfollow",
+                kwargs={"username": self.author.username},
+            )
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    def test_posts_timeline_reads_celebrity_posts(self):
+        """
+        Проверяем, что посты популярных авторов не раскладываются
+        по лентам, но попадают в ленту подписок при чтении.
+        """
+        timeline.mark_celebrity(self.author.pk)
+        self.follow()
+        Post.objects.create(text="Пост звезды", author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        response = self.reader_client.get(reverse("posts:follow_index"))
+        self.assertEqual(len(response.context["page_obj"]), 2)
+
+    def add_followers(self, count):
+        start = Follow.objects.filter(author=self.author).count()
+        users = [
+            User.objects.create_user(username=f"timeline_fan_{number}")
+            for number in range(start, start + count)
+        ]
+        for user in users:
+            Follow.objects.create(user=user, author=self.author)
+        return users
+
+    def feed_texts(self):
+        response = self.reader_client.get(reverse("posts:follow_index"))
+        return [post.text for post in response.context["page_obj"]]
+
+    def test_posts_timeline_author_becomes_celebrity(self):
+        """
+        Проверяем, что пост автора, только что ставшего популярным,
+        сразу виден подписчикам, хотя в ленты он не раскладывается.
+        """
+        with mock.patch.object(timeline, "FANOUT_FOLLOWERS_LIMIT", 2):
+            self.follow()
+            self.add_followers(1)
+            self.assertEqual(self.feed_texts(), ["Пост до подписки"])
+            self.add_followers(1)
+            Post.objects.create(text="Пост звезды", author=self.author)
+            self.assertEqual(
+                self.feed_texts(), ["Пост звезды", "Пост до подписки"]
+            )
+
+    @mock.patch.object(timeline, "FANOUT_FOLLOWERS_LIMIT", 2)
+    @mock.patch.object(timeline, "FANOUT_FOLLOWERS_LOWER_LIMIT", 2)
+    def test_posts_timeline_author_stops_being_celebrity(self):
+        """
+        Проверяем, что отписка не трогает ленты в запросе, а посты
+        автора, у которого подписчиков стало меньше нижней границы,
+        дописывает в ленты периодическая команда.
+        """
+        self.follow()
+        first_fan, second_fan = self.add_followers(2)
+        Post.objects.create(text="Пост звезды", author=self.author)
+        texts = ["Пост звезды", "Пост до подписки"]
+        self.assertEqual(self.feed_texts(), texts)
+        for fan, demoted in ((first_fan, 0), (second_fan, 1)):
+            Follow.objects.filter(user=fan).delete()
+            self.assertEqual(
+                TimelineEntry.objects.filter(user=self.reader).count(), 1
+            )
+            self.assertEqual(self.feed_texts(), texts)
+            out = StringIO()
+            call_command("demote_celebrities", stdout=out)
+            self.assertIn(f"Авторов снова в лентах: {demoted}", out.getvalue())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(self.feed_texts(), texts)
+
+
+class TestPostsCardsCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="Vika")
+        self.post = Post.objects.create(text="Пост в кеше", author=self.user)
+
+    def cached_card(self, post):
+        versions = fragments.author_card_versions([post.author_id])
+        key = fragments.post_card_key(post, versions[post.author_id])
+        return cache.get(key, version=fragments.POST_CARD_VERSION)
+
+    def test_posts_cards_cached_on_feed_render(self):
+        """Проверяем, что карточки постов ленты попадают в кеш."""
+        self.client.get(reverse("posts:index"))
+        self.assertIn(self.post.text, self.cached_card(self.post))
+
+    def test_posts_cards_invalidated_on_author_rename(self):
+        """
+        Проверяем, что смена имени автора обновляет его карточки,
+        не меняя дату изменения постов.
+        """
+        fragments.get_post_cards([self.post])
+        self.user.first_name = "Виктория"
+        self.user.save()
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.updated, self.post.updated)
+        self.assertIsNone(self.cached_card(post))
+        cards = fragments.get_post_cards([post])
+        self.assertIn("Виктория", cards[post.pk])
+
+    def test_posts_cards_kept_on_password_change(self):
+        """
+        Проверяем, что сохранение автора без смены имени, например
+        смена пароля, не трогает его посты и ленты.
+        """
+        updated = self.post.updated
+        version = page_cache.feed_version([page_cache.INDEX_SCOPE])
+        self.user.set_password("новый-пароль")
+        self.user.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated, updated)
+        self.assertEqual(
+            page_cache.feed_version([page_cache.INDEX_SCOPE]), version
+        )
+
+    def test_posts_cards_invalidated_on_delete(self):
+        """Проверяем, что удаление поста убирает его карточку из кеша."""
+        fragments.get_post_cards([self.post])
+        self.assertIsNotNone(self.cached_card(self.post))
+        self.post.delete()
+        self.assertIsNone(self.cached_card(self.post))
+
+
+class TestPostsCounters(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="counted_author")
+        self.reader = User.objects.create_user(username="counted_reader")
+        self.group = Group.objects.create(
+            title="Группа счётчиков", slug="counters", description="-"
+        )
+        self.post = Post.objects.create(
+            text="Посчитанный пост", author=self.author, group=self.group
+        )
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_posts_counters_follow_writes(self):
+        """Проверяем, что счётчики меняются вместе с записями."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(post=self.post, author=self.reader, text="!")
+        self.post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        self.post.group = None
+        self.post.save()
+        Follow.objects.filter(user=self.reader).delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_posts_counters_not_overwritten_by_save(self):
+        """Проверяем, что сохранение устаревшего поста не сбивает счётчик."""
+        stale_post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.reader, text="!")
+        stale_post.text = "Отредактированный пост"
+        stale_post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def delete_queries(self, comments):
+        post = Post.objects.create(text="Обсуждаемый", author=self.author)
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.reader, text="!")
+            for _ in range(comments)
+        )
+        post = Post.objects.get(pk=post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        return len(queries)
+
+    def test_posts_delete_cost_independent_of_comments(self):
+        """
+        Проверяем, что удаление поста не обрабатывает его
+        комментарии по одному: число запросов не растёт с ними.
+        """
+        # Первое удаление заполняет кеш популярных авторов.
+        self.delete_queries(1)
+        self.assertEqual(self.delete_queries(2), self.delete_queries(50))
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text="!"
+        )
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_posts_counters_recount_repairs_drift(self):
+        """Проверяем, что команда пересчёта чинит разъехавшиеся счётчики."""
+        Post.objects.bulk_create(
+            [Post(text="Мимо сигналов", author=self.author, group=self.group)]
+        )
+        call_command("recount_counters", stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 2)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+
+    def test_posts_counters_in_views_context(self):
+        """Проверяем, что страницы берут количество постов из счётчиков."""
+        response = self.client.get(
+            reverse("posts:profile", kwargs={"username": "counted_author"})
+        )
+        self.assertEqual(response.context["posts_count"], 1)
+        self.assertEqual(response.context["followers_count"], 0)
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        )
+        self.assertEqual(response.context["posts_count"], 1)
+
+
+class TestPostsSearch(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Searcher")
+        cls.group = Group.objects.create(
+            title="Группа поиска", slug="search-group", description="-"
+        )
+        cls.cat_post = Post.objects.create(
+            text="Котики спасают мир", author=cls.user, group=cls.group
+        )
+        cls.dog_post = Post.objects.create(
+            text="Собаки тоже спасают мир", author=cls.user
+        )
+
+    def search(self, **params):
+        response = self.client.get(reverse("posts:search"), params)
+        return response.context["posts"]
+
+    def test_posts_search_finds_by_words(self):
+        """Проверяем, что поиск находит посты по словам и префиксам."""
+        self.assertEqual(self.search(q="котик"), [self.cat_post])
+        self.assertEqual(len(self.search(q="СПАСАЮТ мир")), 2)
+        self.assertEqual(self.search(q='"мир" OR *'), [])
+
+    def test_posts_search_filters_by_group_and_author(self):
+        """Проверяем фильтры поиска по группе и автору."""
+        self.assertEqual(
+            self.search(q="спасают", group=self.group.slug), [self.cat_post]
+        )
+        self.assertEqual(
+            len(self.search(q="спасают", author=self.user.username)), 2
+        )
+
+    def test_posts_search_index_follows_writes(self):
+        """Проверяем, что индекс обновляется при правке и удалении поста."""
+        self.dog_post.text = "Попугаи"
+        self.dog_post.save()
+        self.assertEqual(self.search(q="попугаи"), [self.dog_post])
+        self.dog_post.delete()
+        self.assertEqual(self.search(q="попугаи"), [])
+
+    def test_posts_search_cursor_pages(self):
+        """Проверяем, что страницы поиска листаются по курсору."""
+        posts, next_cursor = search.search_posts("спасают", 1)
+        self.assertTrue(next_cursor)
+        next_posts, last_cursor = search.search_posts(
+            "спасают", 1, cursor=next_cursor
+        )
+        self.assertEqual(len(next_posts), 1)
+        self.assertNotEqual(posts, next_posts)
+        self.assertEqual(last_cursor, "")
+
+    def test_posts_search_reindex_command(self):
+        """Проверяем, что команда переиндексации подхватывает посты."""
+        Post.objects.bulk_create(
+            [Post(text="Хомяки без сигналов", author=self.user)]
+        )
+        self.assertEqual(self.search(q="хомяки"), [])
+        call_command("reindex_posts", stdout=StringIO())
+        self.assertEqual(len(self.search(q="хомяки")), 1)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestPostsThumbnails(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Painter")
+        image = BytesIO()
+        Image.new("RGB", (50, 40), (255, 0, 0)).save(image, "PNG")
+        cls.post = Post.objects.create(
+            text="Пост с миниатюрой",
+            author=cls.user,
+            image=SimpleUploadedFile("red.png", image.getvalue()),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_thumbnail_fields_set_on_save(self):
+        """
+        Проверяем, что при сохранении картинки в пост
+        записываются имя и размеры миниатюры.
+        """
+        self.post.refresh_from_db()
+        self.assertEqual(
+            self.post.thumbnail,
+            thumbnails.thumbnail_name(self.post.image.name),
+        )
+        self.assertEqual(
+            (self.post.thumbnail_width, self.post.thumbnail_height),
+            thumbnails.THUMBNAIL_SIZE,
+        )
+
+    def test_posts_thumbnail_renditions_generated_and_rendered(self):
+        """
+        Проверяем, что создаются версии картинки всех ширин,
+        а лента выводит их в srcset.
+        """
+        post = Post.objects.get(pk=self.post.pk)
+        storage = post.image.storage
+        self.assertTrue(thumbnails.generate_renditions(post.image.name))
+        for image_format, items in thumbnails.renditions(
+            post.image.name
+        ).items():
+            for width, name in items:
+                with self.subTest(image_format=image_format, width=width):
+                    with Image.open(storage.path(name)) as rendition:
+                        self.assertEqual(
+                            rendition.size,
+                            (width, thumbnails.rendition_height(width)),
+                        )
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, f'src="{post.thumbnail_url}"')
+        self.assertContains(response, "320w")
+        self.assertContains(response, 'type="image/webp"')
+
+    def test_posts_thumbnail_names_keep_extension(self):
+        """Проверяем, что у cat.jpg и cat.png разные версии."""
+        names = {
+            thumbnails.rendition_name(f"posts/cat.{extension}", 960, "webp")
+            for extension in ("jpg", "png")
+        }
+        self.assertEqual(
+            names,
+            {
+                "posts/thumbs/cat.jpg_960w.webp",
+                "posts/thumbs/cat.png_960w.webp",
+            },
+        )
+
+    def test_posts_thumbnail_missing_shows_original(self):
+        """
+        Проверяем, что пост без миниатюры, например загруженный
+        до их появления, выводит исходную картинку.
+        """
+        Post.objects.filter(pk=self.post.pk).update(thumbnail="")
+        post = Post.objects.get(pk=self.post.pk)
+        response = self.client.get(
+            reverse("posts:post_detail", args=[post.pk])
+        )
+        self.assertContains(response, f'src="{post.image.url}"')
+
+    def test_posts_thumbnail_backfill_command(self):
+        """Проверяем, что команда создаёт недостающие миниатюры."""
+        Post.objects.filter(pk=self.post.pk).update(thumbnail="")
+        call_command("generate_thumbnails", workers=1, stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(post.image.storage.exists(post.thumbnail))
+
+
+class TestPostsQueryBudgets(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Budget")
+        cls.author = User.objects.create_user(username="BudgetAuthor")
+        cls.group = Group.objects.create(
+            title="Группа бюджета", slug="budget", description="Описание"
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for number in range(15):
+            post = Post.objects.create(
+                text=f"Пост бюджета {number}",
+                author=cls.author,
+                group=cls.group,
+            )
+            Comment.objects.create(
+                post=post, author=cls.user, text=f"Комментарий {number}"
+            )
+        cls.post = post
+        cls.urls = {
+            "posts:index": reverse("posts:index"),
+            "posts:trending": reverse("posts:trending"),
+            "posts:group_list": reverse(
+                "posts:group_list", args=[cls.group.slug]
+            ),
+            "posts:profile": reverse(
+                "posts:profile", args=[cls.author.username]
+            ),
+            "posts:post_detail": reverse(
+                "posts:post_detail", args=[cls.post.pk]
+            ),
+            "posts:post_comments": reverse(
+                "posts:post_comments", args=[cls.post.pk]
+            ),
+            "posts:post_create": reverse("posts:post_create"),
+            "posts:post_edit": reverse("posts:post_edit", args=[cls.post.pk]),
+            "posts:add_comment": reverse(
+                "posts:add_comment", args=[cls.post.pk]
+            ),
+            "posts:follow_index": reverse("posts:follow_index"),
+            "posts:search": reverse("posts:search") + "?q=бюджета",
+            "posts:followers": reverse(
+                "posts:followers", args=[cls.author.username]
+            ),
+            "posts:following": reverse(
+                "posts:following", args=[cls.user.username]
+            ),
+            "posts:profile_follow": reverse(
+                "posts:profile_follow", args=[cls.author.username]
+            ),
+            "posts:profile_unfollow": reverse(
+                "posts:profile_unfollow", args=[cls.author.username]
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_posts_urls_have_query_budgets(self):
+        """Проверяем, что бюджет задан для каждого адреса posts.urls."""
+        names = {f"posts:{pattern.name}" for pattern in posts_urls.urlpatterns}
+        self.assertEqual(names, set(self.urls))
+
+    def test_posts_views_within_query_budget(self):
+        """
+        Проверяем, что страницы posts укладываются в бюджет запросов
+        на холодном кеше и не повторяют одинаковые запросы.
+        """
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                cache.clear()
+                if name == "posts:add_comment":
+                    response = self.client.post(url, {"text": "Ещё один"})
+                else:
+                    response = self.client.get(url)
+                self.assertWithinQueryBudget(response)
+
+
+class TestPostsFollowGraph(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Reader")
+        cls.authors = [
+            User.objects.create_user(username=f"Followed{number}")
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_posts_follow_graph_loaded_once(self):
+        """
+        Проверяем, что подписки грузятся одним запросом на запрос
+        страницы, а следующие запросы берут их из кеша.
+        """
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            states = [
+                follow_graph.is_following(user, author)
+                for author in self.authors
+            ]
+        self.assertEqual(states, [True, False, False])
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            follow_graph.followed_author_ids(user)
+
+    def test_posts_follow_graph_invalidated_by_follow(self):
+        """Проверяем, что подписка и отписка сбрасывают кеш подписок."""
+        author = self.authors[1]
+        follow_graph.followed_author_ids(self.fresh_user())
+        self.client.get(reverse("posts:profile_follow", args=[author]))
+        self.assertTrue(follow_graph.is_following(self.fresh_user(), author))
+        self.client.get(reverse("posts:profile_unfollow", args=[author]))
+        self.assertFalse(
+            follow_graph.is_following(self.fresh_user(), author)
+        )
+
+    def test_posts_profile_follow_button_uses_filter(self):
+        """Проверяем, что кнопка в профиле отражает подписку."""
+        response = self.client.get(
+            reverse("posts:profile", args=[self.authors[0]])
+        )
+        self.assertContains(response, "Отписаться")
+        response = self.client.get(
+            reverse("posts:profile", args=[self.authors[1]])
+        )
+        self.assertContains(response, "Подписаться")
+
+
+class TestPostsFollowLists(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.star = User.objects.create_user(username="Star")
+        cls.fans = User.objects.bulk_create(
+            User(username=f"Fan{number}")
+            for number in range(views.USERS_PER_PAGE + 5)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=fan, author=cls.star)
+            for fan in User.objects.filter(username__startswith="Fan")
+        )
+        counters.recount()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_followers_keyset_pages(self):
+        """
+        Проверяем, что подписчики выводятся страницами по id
+        без пропусков, а счётчик берётся из денормализованных полей.
+        """
+        url = reverse("posts:followers", args=[self.star.username])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.context["count"], len(self.fans))
+        users = response.context["users"]
+        self.assertEqual(len(users), views.USERS_PER_PAGE)
+        response = self.client.get(
+            url, {"after": response.context["next_after"]}
+        )
+        self.assertIsNone(response.context["next_after"])
+        users += response.context["users"]
+        self.assertEqual(
+            {user.username for user in users},
+            {f"Fan{number}" for number in range(len(self.fans))},
+        )
+
+    def test_posts_following_page_shows_follow_state(self):
+        """Проверяем страницу подписок и кнопки подписки на ней."""
+        fan = User.objects.get(username="Fan0")
+        self.client.force_login(fan)
+        response = self.client.get(
+            reverse("posts:following", args=[fan.username])
+        )
+        self.assertEqual(response.context["users"], [self.star])
+        self.assertContains(response, "Отписаться")
+
+
+class TestPostsTrending(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Trendy")
+        cls.reader = User.objects.create_user(username="TrendReader")
+        now = dj_timezone.now()
+        with manual_pub_date(Post):
+            Post.objects.bulk_create(
+                Post(
+                    text=f"Популярный пост {number}",
+                    author=cls.author,
+                    pub_date=now - timedelta(hours=number),
+                )
+                for number in range(15)
+            )
+        cls.old = Post.objects.create(text="Старый пост", author=cls.author)
+        Post.objects.filter(pk=cls.old.pk).update(
+            pub_date=now - trending.TRENDING_WINDOW - timedelta(days=1)
+        )
+        cls.discussed = Post.objects.get(text="Популярный пост 5")
+        Comment.objects.bulk_create(
+            Comment(post=cls.discussed, author=cls.reader, text="Ого")
+            for _ in range(20)
+        )
+        counters.recount()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_trending_scores_decay(self):
+        """
+        Проверяем, что обсуждаемый пост поднимается выше свежих,
+        а посты вне окна в рейтинг не попадают.
+        """
+        self.assertEqual(trending.compute_trending(), 15)
+        ranked = list(
+            TrendingPost.objects.order_by("-score").values_list(
+                "post__text", flat=True
+            )
+        )
+        self.assertEqual(ranked[0], "Популярный пост 5")
+        self.assertEqual(ranked[1], "Популярный пост 0")
+        self.assertNotIn("Старый пост", ranked)
+
+    def test_posts_trending_view_cursor_pages(self):
+        """
+        Проверяем, что страницы рейтинга идут по курсору без повторов
+        и обновляются после пересчёта.
+        """
+        url = reverse("posts:trending")
+        self.assertEqual(self.client.get(url).context["posts"], [])
+        call_command("compute_trending", stdout=StringIO())
+        response = self.client.get(url)
+        posts = response.context["posts"]
+        self.assertEqual(len(posts), views.POSTS_PER_PAGE)
+        response = self.client.get(
+            url, {"cursor": response.context["next_cursor"]}
+        )
+        self.assertEqual(response.context["next_cursor"], "")
+        posts += response.context["posts"]
+        self.assertEqual(len({post.pk for post in posts}), 15)
+
+    def test_posts_trending_page_drops_deleted_post(self):
+        """Проверяем, что удалённый пост сразу пропадает из рейтинга."""
+        trending.compute_trending()
+        url = reverse("posts:trending")
+        self.assertContains(self.client.get(url), self.discussed.text)
+        Post.objects.get(pk=self.discussed.pk).delete()
+        self.assertNotContains(self.client.get(url), self.discussed.text)
+
+
+class TestPostsConditionalGet(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Conditional")
+        cls.reader = User.objects.create_user(username="ConditionalReader")
+        cls.group = Group.objects.create(
+            title="Группа 304", slug="not-modified", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            text="Пост для 304", author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", args=[cls.group.slug]),
+            reverse("posts:profile", args=[cls.author.username]),
+            reverse("posts:post_detail", args=[cls.post.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_not_modified_without_queries(self):
+        """
+        Проверяем, что повторный запрос с ETag получает 304,
+        не загружая посты страницы.
+        """
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn("Last-Modified", response)
+                # Для поста нужен один запрос за автором и группой.
+                queries = int(url == self.urls[-1])
+                with self.assertNumQueries(queries):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response["ETag"]
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_posts_if_modified_since(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_posts_modified_after_changes(self):
+        """Проверяем, что комментарий и новый пост меняют ETag страниц."""
+        etags = {url: self.client.get(url)["ETag"] for url in self.urls}
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Свежий комментарий"
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_posts_etag_depends_on_session(self):
+        url = reverse("posts:index")
+        etag = self.client.get(url)["ETag"]
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_posts_unknown_scope_version_expires(self):
+        """
+        Проверяем, что версия, заведённая чтением, например ETag
+        несуществующей группы, живёт ограниченное время.
+        """
+        key = page_cache._version_key(page_cache.group_scope("nope"))
+        with mock.patch.object(page_cache, "cache") as fake_cache:
+            fake_cache.get_many.side_effect = [{}, {key: 1}]
+            page_cache.feed_version([page_cache.group_scope("nope")])
+        fake_cache.add.assert_called_once_with(
+            key, mock.ANY, page_cache.FEED_VERSION_TIMEOUT
+        )
+
+
+class TestPostsRowCounts(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Counted")
+        cls.reader = User.objects.create_user(username="CountedReader")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(15):
+            Post.objects.create(text=f"Пост {number}", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def index_paginator(self):
+        return views.paginate_posts(
+            Post.objects.all(),
+            RequestFactory().get("/"),
+            count_key=counters.INDEX_COUNT_KEY,
+            estimate=lambda: counters.estimate_rows(Post),
+        ).paginator
+
+    def test_posts_row_count_cached(self):
+        """
+        Проверяем, что COUNT(*) ленты выполняется один раз,
+        а новый пост сбрасывает закешированное число.
+        """
+        self.assertEqual(self.index_paginator().count, 15)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index_paginator().count, 15)
+        Post.objects.create(text="Ещё пост", author=self.author)
+        self.assertEqual(self.index_paginator().count, 16)
+
+    def test_posts_timeline_count_invalidated_by_fan_out(self):
+        url = reverse("posts:follow_index")
+        response = self.reader_client.get(url)
+        self.assertEqual(response.context["page_obj"].paginator.count, 15)
+        Post.objects.create(text="Пост в ленту", author=self.author)
+        response = self.reader_client.get(url)
+        self.assertEqual(response.context["page_obj"].paginator.count, 16)
+
+    def test_posts_timeline_count_invalidated_by_delete(self):
+        """
+        Проверяем, что удаление постов, по одному и пачкой из админки,
+        сбрасывает число постов в лентах подписчиков.
+        """
+        url = reverse("posts:follow_index")
+        response = self.reader_client.get(url)
+        self.assertEqual(response.context["page_obj"].paginator.num_pages, 2)
+        for post in Post.objects.all()[:10]:
+            post.delete()
+        response = self.reader_client.get(url)
+        self.assertEqual(response.context["page_obj"].paginator.num_pages, 1)
+        bulk.delete_posts_by_authors([self.author.pk])
+        response = self.reader_client.get(url)
+        self.assertEqual(response.context["page_obj"].paginator.count, 0)
+
+    def test_posts_timeline_count_not_cached_for_celebrities(self):
+        """
+        Проверяем, что число постов ленты подписчика популярного
+        автора не кешируется: его посты не проходят через ленту.
+        """
+        url = reverse("posts:follow_index")
+        timeline.mark_celebrity(self.author.pk)
+        self.reader_client.get(url)
+        Post.objects.create(text="Пост звезды", author=self.author)
+        response = self.reader_client.get(url)
+        self.assertEqual(response.context["page_obj"].paginator.count, 16)
+
+    @override_settings(ROW_COUNT_ESTIMATE_THRESHOLD=10)
+    def test_posts_row_count_estimate_hides_last_pages(self):
+        """
+        Проверяем, что при примерном числе страниц не выводятся
+        ссылки на последние страницы, которые могут быть пустыми.
+        """
+        with mock.patch.object(views, "estimate_rows", return_value=1000):
+            response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, "Последняя")
+        self.assertNotContains(response, "?page=100")
+        self.assertEqual(
+            response.context["page_obj"].page_window[-1],
+            CursorPaginator.ELLIPSIS,
+        )
+
+    @override_settings(ROW_COUNT_ESTIMATE_THRESHOLD=10)
+    def test_posts_row_count_estimate(self):
+        """
+        Проверяем, что выше порога число берётся из статистики
+        базы и помечается как примерное.
+        """
+        with mock.patch.object(views, "estimate_rows", return_value=1000):
+            response = self.client.get(reverse("posts:index"))
+        paginator = response.context["page_obj"].paginator
+        self.assertTrue(paginator.approximate)
+        self.assertEqual(paginator.num_pages, 100)
+        self.assertContains(response, "Около 100 страниц")
+
+    def test_posts_estimate_rows_from_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.assertEqual(counters.estimate_rows(Post), Post.objects.count())
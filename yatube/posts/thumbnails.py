@@ -0,0 +1,155 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+# Картинка карточки поста обрезается по центру до пропорций 960x339
+# и сохраняется в нескольких ширинах для srcset.
+THUMBNAIL_SIZE = (960, 339)
+RENDITION_WIDTHS = (320, 640, 960, 1920)
+THUMBNAIL_DIR = "posts/thumbs"
+THUMBNAIL_FIELDS = ("thumbnail", "thumbnail_width", "thumbnail_height")
+# Форматы в порядке предпочтения; JPEG — запасной вариант для img.
+FALLBACK_FORMAT = "jpeg"
+RENDITION_FORMATS = {
+    "avif": {"quality": 60},
+    "webp": {"quality": 80, "method": 4},
+    "jpeg": {"quality": 85, "optimize": True, "progressive": True},
+}
+FORMAT_EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+
+_executor = None
+
+
+def available_formats():
+    return [
+        image_format
+        for image_format in RENDITION_FORMATS
+        if image_format == FALLBACK_FORMAT or features.check(image_format)
+    ]
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "POSTS_THUMBNAIL_WORKERS", 2),
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def get_storage():
+    return Post._meta.get_field("image").storage
+
+
+def rendition_height(width):
+    base_width, base_height = THUMBNAIL_SIZE
+    return round(width * base_height / base_width)
+
+
+def rendition_name(image_name, width, image_format):
+    # Расширение оригинала остаётся в имени: cat.jpg и cat.png —
+    # разные загрузки, и их версии не должны перезаписывать друг друга.
+    name = os.path.basename(image_name)
+    extension = FORMAT_EXTENSIONS[image_format]
+    return f"{THUMBNAIL_DIR}/{name}_{width}w.{extension}"
+
+
+def thumbnail_name(image_name):
+    return rendition_name(image_name, THUMBNAIL_SIZE[0], FALLBACK_FORMAT)
+
+
+def thumbnail_fields(post):
+    """Поля основной миниатюры, соответствующие текущей картинке поста."""
+    if not post.image:
+        return {
+            "thumbnail": "",
+            "thumbnail_width": None,
+            "thumbnail_height": None,
+        }
+    width, height = THUMBNAIL_SIZE
+    return {
+        "thumbnail": thumbnail_name(post.image.name),
+        "thumbnail_width": width,
+        "thumbnail_height": height,
+    }
+
+
+def renditions(image_name):
+    """Словарь {формат: [(ширина, имя файла), ...]} для картинки."""
+    return {
+        image_format: [
+            (width, rendition_name(image_name, width, image_format))
+            for width in RENDITION_WIDTHS
+        ]
+        for image_format in available_formats()
+    }
+
+
+def generate_renditions(image_name):
+    """
+    Декодирует картинку один раз и сохраняет все её версии.
+
+    Работает только с файлами, без запросов к базе, поэтому
+    безопасно выполняется в фоновом потоке или отдельном процессе.
+    """
+    storage = get_storage()
+    try:
+        with storage.open(image_name) as source:
+            image = Image.open(source)
+            largest = max(RENDITION_WIDTHS)
+            image = ImageOps.fit(
+                image.convert("RGB"),
+                (largest, rendition_height(largest)),
+                Image.LANCZOS,
+            )
+        formats = available_formats()
+        for width in sorted(RENDITION_WIDTHS, reverse=True):
+            size = (width, rendition_height(width))
+            image = image.resize(size, Image.LANCZOS)
+            for image_format in formats:
+                options = RENDITION_FORMATS[image_format]
+                content = BytesIO()
+                image.save(content, image_format.upper(), **options)
+                name = rendition_name(image_name, width, image_format)
+                if storage.exists(name):
+                    storage.delete(name)
+                storage.save(name, ContentFile(content.getvalue()))
+    except (OSError, ValueError, SuspiciousOperation) as error:
+        logger.warning("Не удалось создать версии %s: %s", image_name, error)
+        return False
+    return True
+
+
+def schedule_thumbnail(post):
+    """
+    Записывает в пост поля миниатюры и ставит генерацию версий в очередь.
+
+    Размеры версий известны заранее, поэтому шаблоны сразу
+    выводят img со srcset, не обращаясь к хранилищу и KV-store sorl.
+    """
+    fields = thumbnail_fields(post)
+    if all(getattr(post, field) == value for field, value in fields.items()):
+        return
+    Post.objects.filter(pk=post.pk).update(**fields)
+    for field, value in fields.items():
+        setattr(post, field, value)
+    if not post.thumbnail:
+        return
+    image_name = post.image.name
+    transaction.on_commit(
+        lambda: get_executor().submit(generate_renditions, image_name)
+    )
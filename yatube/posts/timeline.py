@@ -0,0 +1,250 @@
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+
+from . import counters, follow_graph
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации: их посты подмешиваются в ленту при чтении.
+FANOUT_FOLLOWERS_LIMIT = 1000
+# Популярный автор снова раскладывается, только когда подписчиков
+# стало заметно меньше: иначе автор на границе переключался бы
+# туда и обратно на каждой подписке и отписке.
+FANOUT_FOLLOWERS_LOWER_LIMIT = 800
+# Сколько последних записей ленты учитывается при чтении.
+TIMELINE_LENGTH = 1000
+FANOUT_BATCH_SIZE = 500
+CELEBRITIES_CACHE_KEY = "timeline_celebrities"
+CELEBRITIES_CACHE_TIMEOUT = 600
+
+
+def is_celebrity(author_id):
+    return author_id in celebrity_ids()
+
+
+def celebrity_ids():
+    """Возвращает id авторов, чьи посты читаются из ленты без раскладки."""
+    ids = cache.get(CELEBRITIES_CACHE_KEY)
+    if ids is None:
+        ids = set(
+            AuthorStats.objects.filter(celebrity=True).values_list(
+                "user_id", flat=True
+            )
+        )
+        cache.set(CELEBRITIES_CACHE_KEY, ids, CELEBRITIES_CACHE_TIMEOUT)
+    return ids
+
+
+def mark_celebrity(author_id, celebrity=True):
+    AuthorStats.objects.update_or_create(
+        user_id=author_id, defaults={"celebrity": celebrity}
+    )
+    cache.delete(CELEBRITIES_CACHE_KEY)
+
+
+def reset_celebrities(author_stats_model, follow_model):
+    """
+    Отмечает популярными авторов, у которых больше
+    FANOUT_FOLLOWERS_LIMIT подписчиков. Модели передаются явно,
+    чтобы миграции могли вызывать функцию со своими моделями.
+    """
+    celebrities = (
+        follow_model.objects.values("author")
+        .annotate(followers=Count("id"))
+        .filter(followers__gt=FANOUT_FOLLOWERS_LIMIT)
+        .values("author")
+    )
+    author_stats_model.objects.update(celebrity=False)
+    author_stats_model.objects.filter(user__in=celebrities).update(
+        celebrity=True
+    )
+
+
+def has_exactly(queryset, number):
+    """Ровно ли number строк в queryset: читается не больше двух строк."""
+    start = max(number - 1, 0)
+    return queryset[start:number + 1].count() == min(number, 1)
+
+
+def followers_changed(author_id):
+    """
+    Отмечает популярным автора, у которого новая подписка превысила
+    FANOUT_FOLLOWERS_LIMIT: его посты больше не раскладываются.
+
+    Обратный переход делает demote_celebrities вне запроса: ему нужно
+    дописать посты автора в ленты всех подписчиков.
+    """
+    if is_celebrity(author_id):
+        return
+    followers = Follow.objects.filter(author_id=author_id).order_by()
+    if has_exactly(followers, FANOUT_FOLLOWERS_LIMIT + 1):
+        mark_celebrity(author_id)
+
+
+def fill_author_timelines(author_id):
+    """Дописывает последние посты автора в ленты всех его подписчиков."""
+    timeline_table = TimelineEntry._meta.db_table
+    follow_table = Follow._meta.db_table
+    post_table = Post._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {timeline_table} (user_id, post_id, pub_date) "
+            f"SELECT f.user_id, p.id, p.pub_date FROM {follow_table} f, "
+            f"(SELECT id, pub_date FROM {post_table} WHERE author_id = %s "
+            "ORDER BY pub_date DESC, id DESC LIMIT %s) p "
+            "WHERE f.author_id = %s ON CONFLICT DO NOTHING",
+            [author_id, TIMELINE_LENGTH, author_id],
+        )
+
+
+def demote_celebrities():
+    """
+    Снова раскладывает по лентам посты авторов, у которых подписчиков
+    стало меньше FANOUT_FOLLOWERS_LOWER_LIMIT. Возвращает их число.
+    """
+    author_ids = list(
+        AuthorStats.objects.filter(
+            celebrity=True,
+            followers_count__lt=FANOUT_FOLLOWERS_LOWER_LIMIT,
+        ).values_list("user_id", flat=True)
+    )
+    for author_id in author_ids:
+        # Сначала снимается отметка, чтобы новые посты уже раскладывались;
+        # успевшие разложиться INSERT пропустит по уникальности записи.
+        mark_celebrity(author_id, celebrity=False)
+        fill_author_timelines(author_id)
+        invalidate_follower_counts([author_id])
+    return len(author_ids)
+
+
+def home_timeline_count_key(user):
+    """
+    Ключ закешированного числа постов ленты подписок. Посты популярных
+    авторов подмешиваются при чтении и меняют это число без записей
+    в ленте, поэтому подписчикам популярных авторов оно не кешируется.
+    """
+    if follow_graph.followed_author_ids(user) & celebrity_ids():
+        return None
+    return counters.timeline_count_key(user.pk)
+
+
+def invalidate_follower_counts(author_ids):
+    """Сбрасывает число постов в лентах подписчиков авторов."""
+    followers = Follow.objects.filter(author_id__in=author_ids).exclude(
+        author_id__in=celebrity_ids()
+    )
+    counters.invalidate_row_counts(
+        *(
+            counters.timeline_count_key(user_id)
+            for user_id in followers.values_list("user_id", flat=True)
+        )
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    # Подписчиков не больше FANOUT_FOLLOWERS_LIMIT.
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            "user_id", flat=True
+        )
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids
+        ),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    counters.invalidate_row_counts(
+        *(counters.timeline_count_key(user_id) for user_id in follower_ids)
+    )
+
+
+def add_author_to_timeline(user_id, author_id):
+    """Добавляет в ленту читателя последние посты нового автора."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "pk", "pub_date"
+    )[:TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove_author_from_timeline(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def home_timeline(user):
+    """
+    Посты для ленты подписок: последние записи материализованной ленты
+    и последние посты каждого популярного автора, которые не
+    раскладывались при публикации.
+
+    Источники склеиваются UNION ALL: через OR планировщик предпочитает
+    пройти все посты по индексу даты, а так каждый источник читается
+    по своему индексу и сортируется не больше TIMELINE_LENGTH постов
+    на источник.
+    """
+    entries = (
+        TimelineEntry.objects.filter(user=user)
+        .order_by("-pub_date")
+        .values("post_id")[:TIMELINE_LENGTH]
+    )
+    celebrities = follow_graph.followed_author_ids(user) & celebrity_ids()
+    if not celebrities:
+        return Post.objects.filter(pk__in=entries)
+    sources = [entries] + [
+        Post.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-id")
+        .values("pk")[:TIMELINE_LENGTH]
+        for author_id in sorted(celebrities)
+    ]
+    # Части UNION не могут быть срезами, поэтому каждый срез обёрнут.
+    first, *rest = (
+        Post.objects.filter(pk__in=source).order_by().values("pk")
+        for source in sources
+    )
+    return Post.objects.filter(pk__in=first.union(*rest, all=True))
+
+
+def fill_timelines(cursor, timeline_model, follow_model, post_model):
+    """
+    Раскладывает посты всех авторов, кроме популярных, по лентам
+    подписчиков одним INSERT ... SELECT. Модели передаются явно,
+    чтобы миграции могли вызывать функцию со своими моделями.
+    """
+    timeline_table = timeline_model._meta.db_table
+    follow_table = follow_model._meta.db_table
+    post_table = post_model._meta.db_table
+    cursor.execute(
+        f"INSERT INTO {timeline_table} (user_id, post_id, pub_date) "
+        f"SELECT f.user_id, p.id, p.pub_date FROM {follow_table} f "
+        f"JOIN {post_table} p ON p.author_id = f.author_id "
+        f"WHERE f.author_id NOT IN (SELECT author_id FROM {follow_table} "
+        "GROUP BY author_id HAVING COUNT(*) > %s)",
+        [FANOUT_FOLLOWERS_LIMIT],
+    )
+
+
+def rebuild_timelines():
+    """Заново раскладывает все посты по лентам."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TimelineEntry._meta.db_table}")
+        fill_timelines(cursor, TimelineEntry, Follow, Post)
+    reset_celebrities(AuthorStats, Follow)
+    cache.delete(CELEBRITIES_CACHE_KEY)
@@ -0,0 +1,91 @@
+import heapq
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import page_cache
+from .models import Post, TrendingPost
+from .paginators import decode_score_cursor, encode_score_cursor
+
+
+# В рейтинг попадают только посты из окна: старые всё равно
+# проиграли бы свежим из-за затухания, а окно ограничивает проход.
+TRENDING_WINDOW = timedelta(days=7)
+TRENDING_SIZE = 1000
+TRENDING_CHUNK_SIZE = 2000
+COMMENT_WEIGHT = 1.0
+FOLLOWERS_WEIGHT = 0.5
+GRAVITY = 1.5
+
+
+def trending_score(comments, followers, age):
+    """
+    Рейтинг поста: комментарии и аудитория автора,
+    затухающие со временем, как в ранжировании Hacker News.
+    """
+    hours = max(age.total_seconds(), 0) / 3600
+    points = (
+        1
+        + COMMENT_WEIGHT * comments
+        + FOLLOWERS_WEIGHT * math.log1p(followers)
+    )
+    return points / (hours + 2) ** GRAVITY
+
+
+def compute_trending(now=None):
+    """
+    Пересчитывает таблицу популярных постов.
+
+    Посты окна читаются потоком по TRENDING_CHUNK_SIZE строк,
+    в памяти держится только куча из TRENDING_SIZE лучших.
+    """
+    now = now or timezone.now()
+    rows = (
+        Post.objects.filter(pub_date__gte=now - TRENDING_WINDOW)
+        .order_by()
+        .values_list(
+            "pk",
+            "pub_date",
+            "comments_count",
+            "author__stats__followers_count",
+        )
+        .iterator(chunk_size=TRENDING_CHUNK_SIZE)
+    )
+    top = heapq.nlargest(
+        TRENDING_SIZE,
+        (
+            (trending_score(comments, followers or 0, now - pub_date), pk)
+            for pk, pub_date, comments, followers in rows
+        ),
+    )
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post_id=pk, score=score) for score, pk in top
+        )
+    page_cache.bump_feeds(page_cache.TRENDING_SCOPE)
+    return len(top)
+
+
+def trending_posts(limit, cursor=None):
+    """Возвращает посты страницы рейтинга и курсор следующей страницы."""
+    entries = TrendingPost.objects.select_related(
+        "post__author", "post__group"
+    ).order_by("-score", "-post_id")
+    position = cursor and decode_score_cursor(cursor)
+    if position:
+        score, pk = position
+        entries = entries.filter(
+            Q(score__lt=score) | Q(score=score, post_id__lt=pk)
+        )
+    entries = list(entries[: limit + 1])
+    next_cursor = ""
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_score_cursor(
+            entries[-1].score, entries[-1].post_id
+        )
+    return [entry.post for entry in entries], next_cursor
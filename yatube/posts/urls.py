@@ -9,10 +9,16 @@ app_name = "posts"
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("trending/", views.trending, name="trending"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
     path("profile/<str:username>/", views.profile, name="profile"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
     path("create/", PostCreateView.as_view(), name="post_create"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path(
         "posts/<int:post_id>/comment/",
@@ -20,6 +26,17 @@ urlpatterns = [
         name="add_comment",
     ),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
+    path(
+        "profile/<str:username>/followers/",
+        views.followers,
+        name="followers",
+    ),
+    path(
+        "profile/<str:username>/following/",
+        views.following,
+        name="following",
+    ),
     path(
         "profile/<str:username>/follow/",
         views.profile_follow,
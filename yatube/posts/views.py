@@ -1,80 +1,191 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
 from django.views.generic.edit import CreateView
 
+from .counters import INDEX_COUNT_KEY, author_stats, estimate_rows
 from .forms import CommentForm, PostForm
 from .models import Comment, Follow, Group, Post, User
+from .page_cache import (
+    INDEX_SCOPE,
+    TRENDING_SCOPE,
+    author_scope,
+    cache_feed,
+    conditional_feed,
+    group_scope,
+)
+from .paginators import CachedCountPaginator, CursorPaginator, get_id_page
+from .search import search_posts
+from .templatetags import paginator_tags
+from .timeline import home_timeline, home_timeline_count_key
+from .trending import trending_posts
 
 
 POSTS_PER_PAGE = 10
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGE_WINDOW = 3
+USERS_PER_PAGE = 50
+COMMENTS_PER_PAGE = 20
+COMMENTS_ORDERINGS = {
+    "newest": ("-pub_date", "-pk"),
+    "oldest": ("pub_date", "pk"),
+}
 
 
-def paginate_posts(queryset, page_number):
-    paginator = Paginator(queryset, POSTS_PER_PAGE)
-    page_object = paginator.get_page(page_number)
+def paginate_posts(
+    queryset, request, count=None, window=PAGE_WINDOW, **count_options
+):
+    """
+    Страница ленты. count — готовое число из счётчиков, иначе
+    count_options (count_key, estimate) для CachedCountPaginator.
+    """
+    paginator = CachedCountPaginator(
+        queryset, POSTS_PER_PAGE, count=count, **count_options
+    )
+    cursor = request.GET.get("cursor")
+    if cursor:
+        return paginator.get_cursor_page(cursor)
+    page_object = paginator.get_page(request.GET.get("page"))
+    page_object.page_window = list(
+        paginator.get_elided_page_range(
+            page_object.number, on_each_side=window
+        )
+    )
     return page_object
 
 
-@cache_page(20, key_prefix="index_page")
+def paginate_comments(post, request):
+    """
+    Страница комментариев поста: первая без COUNT(*), следующие
+    по курсору, поэтому стоимость не зависит от размера обсуждения.
+    Счётчик comments_count только выводится и на выборку не влияет.
+    """
+    order = request.GET.get("order")
+    if order not in COMMENTS_ORDERINGS:
+        order = "newest"
+    paginator = CursorPaginator(
+        Comment.objects.select_related("author").filter(post=post),
+        COMMENTS_PER_PAGE,
+        ordering=COMMENTS_ORDERINGS[order],
+    )
+    cursor = request.GET.get("cursor")
+    if cursor:
+        return paginator.get_cursor_page(cursor), order
+    return paginator.get_first_page(), order
+
+
+def post_scopes(post_id):
+    """Ленты, которые сдвигают правки поста и его комментарии."""
+    row = (
+        Post.objects.filter(pk=post_id)
+        .values_list("author__username", "group__slug")
+        .first()
+    )
+    if row is None:
+        return []
+    username, slug = row
+    scopes = [author_scope(username)]
+    if slug:
+        scopes.append(group_scope(slug))
+    return scopes
+
+
+@conditional_feed(lambda: [INDEX_SCOPE])
+@cache_feed(lambda: [INDEX_SCOPE])
 def index(request):
     posts = Post.objects.select_related("group", "author")
-    page_number = request.GET.get("page")
-    page_obj = paginate_posts(posts, page_number)
+    page_obj = paginate_posts(
+        posts,
+        request,
+        count_key=INDEX_COUNT_KEY,
+        estimate=lambda: estimate_rows(Post),
+    )
     template = "posts/index.html"
     context = {"page_obj": page_obj}
     return render(request, template, context)
 
 
+@cache_feed(lambda: [TRENDING_SCOPE])
+def trending(request):
+    posts, next_cursor = trending_posts(
+        POSTS_PER_PAGE, request.GET.get("cursor")
+    )
+    context = {"posts": posts, "next_cursor": next_cursor}
+    return render(request, "posts/trending.html", context)
+
+
+@conditional_feed(lambda slug: [group_scope(slug)])
+@cache_feed(lambda slug: [group_scope(slug)])
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related("author")
-    page_number = request.GET.get("page")
-    page_obj = paginate_posts(posts, page_number)
+    page_obj = paginate_posts(posts, request, count=group.posts_count)
     template = "posts/group_list.html"
     context = {"group": group, "page_obj": page_obj}
     return render(request, template, context)
 
 
+@conditional_feed(lambda username: [author_scope(username)])
+@cache_feed(lambda username: [author_scope(username)])
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    stats = author_stats(author)
     posts = author.posts.select_related("group")
-    page_number = request.GET.get("page")
-    page_obj = paginate_posts(posts, page_number)
-    posts_count = page_obj.paginator.count
+    page_obj = paginate_posts(posts, request, count=stats.posts_count)
     template = "posts/profile.html"
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(author=author, user=request.user).exists()
-    )
     context = {
         "page_obj": page_obj,
-        "posts_count": posts_count,
+        "posts_count": stats.posts_count,
+        "followers_count": stats.followers_count,
+        "following_count": stats.following_count,
         "username": author,
-        "following": following,
     }
     return render(request, template, context)
 
 
+@conditional_feed(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.select_related("author").filter(post=post)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), pk=post_id
+    )
+    comments, order = paginate_comments(post, request)
     comment_form = CommentForm()
-    author = post.author
-    posts_count = author.posts.count()
+    posts_count = author_stats(post.author).posts_count
     template = "posts/post_detail.html"
     context = {
         "post": post,
         "posts_count": posts_count,
         "user": request.user.id,
         "comments": comments,
+        "comments_order": order,
         "form": comment_form,
     }
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    """JSON со следующей порцией комментариев для «Показать ещё»."""
+    post = get_object_or_404(Post, pk=post_id)
+    comments, order = paginate_comments(post, request)
+    html = render_to_string(
+        "posts/includes/comment_list.html",
+        {"comments": comments},
+        request=request,
+    )
+    return JsonResponse(
+        {
+            "html": html,
+            "next_cursor": paginator_tags.next_cursor(comments),
+            "order": order,
+            "count": post.comments_count,
+        }
+    )
+
+
 class PostCreateView(LoginRequiredMixin, CreateView):
     template_name = "posts/create_post.html"
     model = Post
@@ -122,12 +233,47 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user.id)
-    page_number = request.GET.get("page")
-    page_obj = paginate_posts(posts, page_number)
+    posts = home_timeline(request.user).select_related("group", "author")
+    page_obj = paginate_posts(
+        posts, request, count_key=home_timeline_count_key(request.user)
+    )
     return render(request, "posts/follow.html", context={"page_obj": page_obj})
 
 
+def follow_list(request, username, related, title):
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    stats = author_stats(author)
+    if related == "user":
+        follows = Follow.objects.filter(author=author)
+        count = stats.followers_count
+    else:
+        follows = Follow.objects.filter(user=author)
+        count = stats.following_count
+    follows, next_after = get_id_page(
+        follows.select_related(related),
+        request.GET.get("after"),
+        USERS_PER_PAGE,
+    )
+    context = {
+        "username": author,
+        "title": title,
+        "users": [getattr(follow, related) for follow in follows],
+        "count": count,
+        "next_after": next_after,
+    }
+    return render(request, "posts/follow_list.html", context)
+
+
+def followers(request, username):
+    return follow_list(request, username, "user", "Подписчики")
+
+
+def following(request, username):
+    return follow_list(request, username, "author", "Подписки")
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -143,3 +289,31 @@ def profile_unfollow(request, username):
     user = request.user
     Follow.objects.filter(author=author.id, user=user.id).delete()
     return redirect("posts:profile", username=username)
+
+
+def search(request):
+    query = request.GET.get("q", "")
+    filters = {}
+    if request.GET.get("group"):
+        filters["group"] = get_object_or_404(
+            Group, slug=request.GET["group"]
+        )
+    if request.GET.get("author"):
+        filters["author"] = get_object_or_404(
+            User, username=request.GET["author"]
+        )
+    posts, next_cursor = search_posts(
+        query, POSTS_PER_PAGE, cursor=request.GET.get("cursor"), **filters
+    )
+    next_query = ""
+    if next_cursor:
+        next_query = request.GET.copy()
+        next_query["cursor"] = next_cursor
+        next_query = next_query.urlencode()
+    context = {
+        "query": query,
+        "posts": posts,
+        "next_query": next_query,
+        **filters,
+    }
+    return render(request, "posts/search.html", context)
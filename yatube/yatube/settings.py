@@ -1,4 +1,9 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
+from importlib.util import find_spec
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,11 +33,13 @@ INSTALLED_APPS = [
     "users.apps.UsersConfig",
     "core.apps.CoreConfig",
     "about.apps.AboutConfig",
+    "api.apps.ApiConfig",
     "sorl.thumbnail",
     "debug_toolbar",
 ]
 
 MIDDLEWARE = [
+    "core.middleware.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -41,6 +48,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "yatube.urls"
@@ -73,6 +81,34 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения лент. Локально это второй файл SQLite,
+# который заполняется командой sync_replica.
+REPLICA_DATABASE = os.getenv("YATUBE_REPLICA_DB")
+if REPLICA_DATABASE:
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, REPLICA_DATABASE),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+# Страницы из page_cache.cache_feed и conditional_feed сюда не входят:
+# они кешируются под текущей версией лент, и отстающая реплика
+# закрепила бы в кеше и в ETag страницу без записи, сдвинувшей версию.
+REPLICA_VIEWS = {
+    "posts:followers",
+    "posts:following",
+    "posts:follow_index",
+    "api:posts",
+    "api:post_detail",
+    "api:comments",
+    "api:groups",
+    "api:group_detail",
+    "api:export",
+}
+REPLICA_PIN_COOKIE = "read_primary"
+REPLICA_PIN_SECONDS = 10
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -118,8 +154,97 @@ CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+# Тесты не должны трогать кеш разработчика и кеш друг друга.
+TESTING = sys.argv[1:2] == ["test"] or "pytest" in sys.modules
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix="yatube-cache-")
+    atexit.register(shutil.rmtree, CACHE_DIR, True)
+else:
+    CACHE_DIR = BASE_DIR
+
+# Кеш общий для всех воркеров: Redis, если он задан и установлен
+# django-redis, иначе файл SQLite рядом с базой.
+REDIS_URL = os.getenv("YATUBE_REDIS_URL")
+if REDIS_URL and not TESTING and find_spec("django_redis"):
+    CACHES = {
+        "shared": {
+            "BACKEND": "core.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "COMPRESSOR": "django_redis.compressors.zlib.ZlibCompressor",
+                "CONNECTION_POOL_KWARGS": {"max_connections": 50},
+            },
+        }
+    }
+else:
+    CACHES = {
+        "shared": {
+            "BACKEND": "core.cache.SQLiteCache",
+            "LOCATION": os.path.join(
+                CACHE_DIR, os.getenv("YATUBE_CACHE_FILE", "cache.sqlite3")
+            ),
+            "OPTIONS": {"MAX_ENTRIES": 100000},
+        }
     }
+
+# Горячие ключи читаются из памяти процесса. Версии лент и карточек
+# автора живут там секунду, поэтому запись в другом воркере видна
+# не позже чем через неё, а подписки, блокировки и указатели
+# на свежие страницы всегда общие.
+CACHES["default"] = {
+    "BACKEND": "core.cache.TieredCache",
+    "LOCATION": "shared",
+    "OPTIONS": {
+        "LOCAL_MAX_ENTRIES": 500,
+        "LOCAL_TIMEOUT": 30,
+        "LOCAL_TIMEOUTS": {
+            "feed_version": 1,
+            "card_author": 1,
+            "row_count": 1,
+            "following": 0,
+            "timeline_celebrities": 0,
+            "feed_page_lock": 0,
+            "feed_page_latest": 0,
+        },
+    },
+}
+
+POSTS_SEARCH_BACKEND = "posts.search.SQLiteFTSBackend"
+
+# Ленты длиннее этого числа строк (по статистике базы) показывают
+# примерное число страниц вместо SELECT COUNT(*).
+ROW_COUNT_ESTIMATE_THRESHOLD = 100000
+
+# Сколько SQL-запросов допускается на один ответ view.
+QUERY_BUDGETS = {
+    "posts:index": 5,
+    "posts:trending": 4,
+    "posts:group_list": 5,
+    "posts:profile": 6,
+    "posts:post_detail": 5,
+    "posts:post_comments": 4,
+    "posts:post_create": 4,
+    "posts:post_edit": 5,
+    "posts:add_comment": 8,
+    "posts:follow_index": 6,
+    "posts:search": 5,
+    "posts:followers": 6,
+    "posts:following": 6,
+    "posts:profile_follow": 5,
+    "posts:profile_unfollow": 10,
+    "api:posts": 2,
+    ("api:posts", "POST"): 14,
+    "api:post_detail": 2,
+    ("api:post_detail", "PATCH"): 10,
+    ("api:post_detail", "DELETE"): 24,
+    "api:comments": 3,
+    ("api:comments", "POST"): 9,
+    "api:groups": 2,
+    "api:group_detail": 2,
+    "api:follow": 3,
+    ("api:follow", "POST"): 12,
+    "api:unfollow": 8,
+    # Строки выгрузки читаются уже при отдаче ответа.
+    "api:export": 4,
 }
+QUERY_STATS_HEADERS = DEBUG
@@ -9,6 +9,7 @@ urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
+    path("api/v1/", include("api.urls", namespace="api")),
     path("about/", include("about.urls", namespace="about")),
 ]
 